@@ -1,2 +1 @@
-python src/main.py
-cd public && python3 -m http.server 8888
+python src/main.py --serve --port 8888
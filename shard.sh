@@ -0,0 +1,21 @@
+# Builds the site as N shards in parallel on this machine, then merges them
+# into ./public. Usage: ./shard.sh [N] [extra main.py flags]
+shards=${1:-4}
+shift
+dirs=""
+pids=""
+for i in $(seq 1 "$shards"); do
+    python src/main.py --shard "$i/$shards" "$@" > /dev/null &
+    pids="$pids $!"
+    dirs="$dirs ./.shards/$i-of-$shards"
+done
+# A bare wait always succeeds, each shard's status has to be collected.
+status=0
+for pid in $pids; do
+    wait "$pid" || status=1
+done
+if [ "$status" -ne 0 ]; then
+    echo "A shard failed, not merging" >&2
+    exit 1
+fi
+python src/main.py --merge-shards $dirs "$@"
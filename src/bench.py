@@ -0,0 +1,195 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from markdown_blocks import (markdown_to_blocks,
+    block_to_block_type,
+    block_to_block_type_regex,
+    text_to_textnodes,
+    markdown_to_html_node)
+from main import discover_pages, generate_pages
+
+SHAPES = ("mixed", "links", "lists", "code", "paragraphs")
+STAGES = ("blocks", "classify", "classify_regex", "inline", "html_tree", "serialize", "build")
+WORDS = ("elf", "dwarf", "ring", "shire", "mordor", "wizard", "hobbit", "river",
+    "mountain", "king", "sword", "road", "tower", "forest", "fellowship", "journey")
+
+def sentence(rng, words = 12):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def inline_text(rng, links = 1):
+    parts = [sentence(rng, 6)]
+    for i in range(links):
+        parts.append(f"[{rng.choice(WORDS)} {i}](/{rng.choice(WORDS)}/{i}.html)")
+        parts.append(sentence(rng, 3))
+    parts.append(f"**{rng.choice(WORDS)}** and *{rng.choice(WORDS)}* with `{rng.choice(WORDS)}`")
+    return " ".join(parts)
+
+def generate_block(shape, rng):
+    if shape == "mixed":
+        shape = rng.choice(SHAPES[1:])
+    match shape:
+        case "links":
+            return inline_text(rng, links = rng.randint(10, 40))
+        case "lists":
+            marker = rng.choice(("-", "*", "1."))
+            items = [f"{marker} {inline_text(rng)}" for _ in range(rng.randint(5, 60))]
+            return "\n".join(items)
+        case "code":
+            lines = [f"    {rng.choice(WORDS)}({i})" for i in range(rng.randint(20, 200))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        case "paragraphs":
+            return inline_text(rng, links = rng.randint(0, 2))
+        case _:
+            raise ValueError(f"Invalid corpus shape: {shape}")
+
+def generate_markdown(shape, blocks, rng):
+    ret = [f"# {sentence(rng, 4)}"]
+    for i in range(blocks):
+        if i % 8 == 0:
+            ret.append(f"## {sentence(rng, 3)}")
+        ret.append(generate_block(shape, rng))
+    return "\n\n".join(ret) + "\n"
+
+def generate_corpus(root, pages, shape = "mixed", blocks = 20, seed = 0, pages_per_dir = 100):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        directory = os.path.join(root, f"section{i // pages_per_dir}")
+        os.makedirs(directory, exist_ok = True)
+        path = os.path.join(directory, f"page{i}.md")
+        with open(path, mode = "w") as markdown_file:
+            markdown_file.write(generate_markdown(shape, blocks, rng))
+        paths.append(path)
+    return paths
+
+def time_stage(function, repeat):
+    # Like timeit, collect up front and keep the cyclic GC out of the timings.
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def run_benchmarks(pages = 200, shape = "mixed", blocks = 20, seed = 0, repeat = 3, jobs = 1):
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        public_dir = os.path.join(root, "public")
+        template_path = os.path.join(root, "template.html")
+        with open(template_path, mode = "w") as template_file:
+            template_file.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+        paths = generate_corpus(content_dir, pages, shape, blocks, seed)
+        documents = []
+        for path in paths:
+            with open(path) as markdown_file:
+                documents.append(markdown_file.read())
+        total_bytes = sum(len(document.encode()) for document in documents)
+        block_lists = [markdown_to_blocks(document) for document in documents]
+        blocks_flat = [block for block_list in block_lists for block in block_list]
+        inline_blocks = [block for block in blocks_flat
+            if block_to_block_type(block) not in ("CODE", "UNORDERED LIST", "ORDERED LIST")]
+        trees = [markdown_to_html_node(document) for document in documents]
+
+        def build():
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages(discover_pages(content_dir, public_dir), template_path,
+                    jobs, content_dir)
+
+        stage_functions = {
+            "blocks": lambda: [markdown_to_blocks(document) for document in documents],
+            "classify": lambda: [block_to_block_type(block) for block in blocks_flat],
+            # The previous findall-based classifier, kept as a reference point.
+            "classify_regex": lambda: [block_to_block_type_regex(block) for block in blocks_flat],
+            "inline": lambda: [text_to_textnodes(block) for block in inline_blocks],
+            "html_tree": lambda: [markdown_to_html_node(document) for document in documents],
+            "serialize": lambda: [tree.to_html() for tree in trees],
+            "build": build,
+        }
+        stages = {}
+        for stage in STAGES:
+            seconds = time_stage(stage_functions[stage], repeat)
+            stages[stage] = {
+                "seconds": seconds,
+                "pages_per_second": pages / seconds if seconds > 0 else None,
+                "mb_per_second": total_bytes / 1e6 / seconds if seconds > 0 else None,
+            }
+    return {
+        "config": {"pages": pages, "shape": shape, "blocks": blocks, "seed": seed,
+            "repeat": repeat, "jobs": jobs},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "corpus": {"bytes": total_bytes, "blocks": len(blocks_flat)},
+        "stages": stages,
+    }
+
+def compare_results(baseline, results):
+    ret = {}
+    for stage, timing in results["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+        before = baseline["stages"][stage]["seconds"]
+        if before > 0:
+            ret[stage] = (timing["seconds"] - before) / before * 100
+    return ret
+
+def format_report(results, changes = None):
+    corpus = results["corpus"]
+    lines = [f"{results['config']['pages']} pages, {corpus['blocks']} blocks, "
+        f"{corpus['bytes'] / 1e6:.2f} MB ({results['config']['shape']})",
+        f"{'stage':<16}{'seconds':>10}{'pages/s':>12}{'MB/s':>10}{'change':>10}"]
+    for stage, timing in results["stages"].items():
+        change = ""
+        if changes is not None and stage in changes:
+            change = f"{changes[stage]:+.1f}%"
+        lines.append(f"{stage:<16}{timing['seconds']:>10.4f}"
+            f"{timing['pages_per_second'] or 0:>12.1f}{timing['mb_per_second'] or 0:>10.2f}"
+            f"{change:>10}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the markdown pipeline on a synthetic corpus")
+    parser.add_argument("--pages", type = int, default = 200)
+    parser.add_argument("--shape", choices = SHAPES, default = "mixed")
+    parser.add_argument("--blocks", type = int, default = 20, help = "blocks per page")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--repeat", type = int, default = 3, help = "best of N runs per stage")
+    parser.add_argument("-j", "--jobs", type = int, default = 1, help = "jobs for the build stage")
+    parser.add_argument("--save", help = "write results as JSON to this path")
+    parser.add_argument("--compare", help = "compare against a previously saved JSON result")
+    parser.add_argument("--fail-over", type = float,
+        help = "exit non-zero if any stage is slower than the baseline by this percentage")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.pages, args.shape, args.blocks, args.seed, args.repeat, args.jobs)
+    changes = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            changes = compare_results(json.load(baseline_file), results)
+    print(format_report(results, changes))
+    if args.save:
+        with open(args.save, mode = "w") as results_file:
+            json.dump(results, results_file, indent = 1)
+    if changes is not None and args.fail_over is not None:
+        regressions = [stage for stage, change in changes.items() if change > args.fail_over]
+        if len(regressions) != 0:
+            print(f"Regression over {args.fail_over}% in: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+PARSER_MODULES = ("markdown_blocks.py", "frontmatter.py", "htmlnode.py", "textnode.py")
+
+_parser_version = None
+
+def parser_version():
+    # Derived from the parser sources so any change to them invalidates
+    # every cached entry without a manually bumped version number.
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256()
+        source_dir = os.path.dirname(os.path.abspath(__file__))
+        for module in PARSER_MODULES:
+            with open(os.path.join(source_dir, module), "rb") as source_file:
+                digest.update(source_file.read())
+        _parser_version = digest.hexdigest()
+    return _parser_version
+
+class RenderCache():
+
+    def __init__(self, cache_dir, max_bytes = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, markdown):
+        # A mapped UTF-8 source hashes to the same key as its decoded text.
+        digest = hashlib.sha256(parser_version().encode())
+        if isinstance(markdown, str):
+            markdown = markdown.encode()
+        digest.update(markdown)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".html")
+
+    def text_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, markdown, text = None):
+        # text, when given, is a (headings, body) pair of lists. Only entries
+        # stored with their text are then hits, and the text is appended.
+        key = self.key(markdown)
+        html = self.read(self.path(key))
+        if html is None or text is None:
+            return html
+        cached_text = self.read(self.text_path(key))
+        if cached_text is None:
+            return None
+        headings, body = json.loads(cached_text)
+        text[0].append(headings)
+        text[1].append(body)
+        return html
+
+    def put(self, markdown, html, text = None):
+        key = self.key(markdown)
+        self.write(self.path(key), html)
+        if text is not None:
+            self.write(self.text_path(key), json.dumps([" ".join(text[0]), " ".join(text[1])]))
+
+    def read(self, path):
+        try:
+            with open(path, encoding = "utf-8") as cache_file:
+                data = cache_file.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        # Write then rename so concurrent workers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+        with os.fdopen(fd, mode = "w", encoding = "utf-8") as cache_file:
+            cache_file.write(data)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        ret = []
+        if not os.path.isdir(self.cache_dir):
+            return ret
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                # Only our own entries, other caches may share the directory.
+                if not file_name.endswith((".html", ".json")):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                ret.append((stat.st_mtime_ns, stat.st_size, path))
+        return ret
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+class MemoryCache():
+    # In-process LRU of rendered HTML keyed by the markdown's hash, bounded
+    # by the total size of the HTML it holds. Safe to share between threads.
+
+    def __init__(self, max_bytes = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def key(self, markdown):
+        return hashlib.sha256(markdown.encode()).digest()
+
+    def get(self, markdown):
+        key = self.key(markdown)
+        with self.lock:
+            html = self.entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return html
+
+    def entry_size(self, key, html):
+        return len(html)
+
+    def put(self, markdown, html):
+        key = self.key(markdown)
+        size = self.entry_size(key, html)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entry_size(key, self.entries.pop(key))
+            self.entries[key] = html
+            self.size += size
+            while self.size > self.max_bytes:
+                evicted_key, evicted = self.entries.popitem(last = False)
+                self.size -= self.entry_size(evicted_key, evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups != 0 else 0.0,
+            }
+
+class BlockCache(MemoryCache):
+    # The (html, headings, body) of single blocks, see render_block, keyed by
+    # the block's markdown, which is short enough to be its own key. Sites
+    # repeat footers, notes and list items verbatim, so those are parsed
+    # once per process.
+
+    def __init__(self, max_bytes = 32 * 1024 * 1024):
+        super().__init__(max_bytes)
+
+    def key(self, block):
+        return block
+
+    def entry_size(self, key, rendered):
+        return len(key) + sum(len(part) for part in rendered)
+
+    def counts(self):
+        with self.lock:
+            return self.hits, self.misses
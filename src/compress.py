@@ -0,0 +1,160 @@
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import list_files
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg", ".xml", ".txt")
+COMPRESSED_SUFFIXES = (".gz", ".br")
+# Below this a compressed sibling saves next to nothing.
+MIN_COMPRESS_SIZE = 256
+
+HTML_TOKEN_RE = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>|<!--(?!\[if).*?-->|<[^>]*>|\s+",
+    re.S | re.I)
+BLOCK_TAG_RE = re.compile(r"</?(?:!doctype|address|article|aside|blockquote|body|br|div|dl|dd|dt"
+    r"|figure|footer|form|h[1-6]|head|header|hr|html|li|link|main|meta|nav|ol|p|pre|section"
+    r"|table|tbody|td|tfoot|th|thead|title|tr|ul)\b", re.I)
+CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+', re.S)
+CSS_TIGHT_BEFORE = "{};,>:("
+CSS_TIGHT_AFTER = "{};,>)"
+
+def minify_html(html):
+    # Collapses whitespace and drops comments outside pre, textarea, script
+    # and style. Whitespace next to a block level tag is dropped entirely,
+    # elsewhere it becomes one space so inline text keeps its word breaks.
+    # last_tag holds the (start, end) of the last tag token, so a ">" in
+    # text is never taken for the end of a tag.
+    last_tag = [None, None]
+    def replace(match):
+        token = match.group(0)
+        if token.startswith("<!--") and not token.startswith("<!--[if"):
+            return ""
+        if not token.isspace():
+            # pre, textarea, script and style come as one token, their
+            # closing tag is what precedes the next token.
+            last_tag[0] = html.rfind("<", match.start(), match.end())
+            last_tag[1] = match.end()
+            return token
+        start, end = match.start(), match.end()
+        if start == 0 or end == len(html):
+            return ""
+        if start == last_tag[1] and BLOCK_TAG_RE.match(html, last_tag[0]):
+            return ""
+        if BLOCK_TAG_RE.match(html, end):
+            return ""
+        return " "
+    return HTML_TOKEN_RE.sub(replace, html).strip()
+
+def minify_css(css):
+    def replace(match):
+        token = match.group(0)
+        if token.startswith("/*"):
+            # Keep /*! ... */ license comments.
+            return token if token.startswith("/*!") else ""
+        if not token.isspace():
+            return token
+        start, end = match.start(), match.end()
+        if start == 0 or end == len(css):
+            return ""
+        if css[start - 1] in CSS_TIGHT_BEFORE or css[end] in CSS_TIGHT_AFTER:
+            return ""
+        return " "
+    return CSS_TOKEN_RE.sub(replace, css).strip()
+
+MINIFIERS = {".html": minify_html, ".css": minify_css}
+
+def minifier(path):
+    return MINIFIERS.get(os.path.splitext(path)[1].lower())
+
+def replace_file(path, data):
+    # Write then rename: path may be a hardlink into ./static, and a server
+    # may be reading it while we write.
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path) or ".", suffix = ".tmp")
+    try:
+        with os.fdopen(fd, mode = "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def minify_file(source_path, dest_path):
+    with open(source_path, encoding = "utf-8") as source_file:
+        text = source_file.read()
+    replace_file(dest_path, minifier(source_path)(text).encode("utf-8"))
+    # Same mtime as the source, so sync_static knows dest is up to date.
+    shutil.copystat(source_path, dest_path)
+
+def compress_gzip(data):
+    # mtime = 0 keeps the output identical for identical input.
+    return gzip.compress(data, compresslevel = 9, mtime = 0)
+
+def compress_brotli(data):
+    return brotli.compress(data, quality = 11)
+
+def compressors():
+    ret = {".gz": compress_gzip}
+    if brotli is not None:
+        ret[".br"] = compress_brotli
+    return ret
+
+def is_compressible(path):
+    return (os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+        and os.path.getsize(path) >= MIN_COMPRESS_SIZE)
+
+def precompress_file(path):
+    # Siblings get the source's mtime, and their ctime is set after the
+    # source was last written or replaced. A sibling matching both is
+    # current and is skipped. Returns the number of siblings written.
+    available = compressors()
+    source_stat = os.stat(path)
+    data = None
+    written = 0
+    for suffix in COMPRESSED_SUFFIXES:
+        sibling_path = path + suffix
+        if suffix not in available:
+            if os.path.exists(sibling_path):
+                os.remove(sibling_path)
+            continue
+        try:
+            sibling_stat = os.stat(sibling_path)
+            if (sibling_stat.st_mtime_ns == source_stat.st_mtime_ns
+                    and sibling_stat.st_ctime_ns >= source_stat.st_ctime_ns):
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, "rb") as source_file:
+                data = source_file.read()
+        replace_file(sibling_path, available[suffix](data))
+        shutil.copymode(path, sibling_path)
+        os.utime(sibling_path, ns = (source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        written += 1
+    return written
+
+def precompress_tree(root, max_workers = None):
+    # Writes .gz and, when brotli is installed, .br siblings for every
+    # compressible file under root and removes siblings left behind by
+    # deleted files. zlib and brotli release the GIL, so threads are enough.
+    paths = list_files(root)
+    present = set(paths)
+    targets = []
+    for path in paths:
+        base, suffix = os.path.splitext(path)
+        if suffix in COMPRESSED_SUFFIXES and os.path.splitext(base)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            if base not in present or not is_compressible(os.path.join(root, base)):
+                os.remove(os.path.join(root, path))
+            continue
+        if is_compressible(os.path.join(root, path)):
+            targets.append(os.path.join(root, path))
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        return sum(executor.map(precompress_file, targets))
@@ -0,0 +1,110 @@
+import json
+import sys
+
+from markdown_blocks import markdown_to_html
+
+BATCH_FORMATS = ("nul", "jsonl")
+READ_SIZE = 64 * 1024
+
+def convert(markdown, cache = None, block_cache = None):
+    # Returns the HTML of a markdown document's body, front matter is
+    # skipped. cache is anything with get(markdown) and put(markdown, html),
+    # such as a RenderCache, block_cache a BlockCache shared between
+    # documents.
+    html = None
+    if cache is not None:
+        html = cache.get(markdown)
+    if html is None:
+        html = markdown_to_html(markdown, block_cache)
+        if cache is not None:
+            cache.put(markdown, html)
+    return html
+
+def convert_file(path, cache = None, block_cache = None):
+    with open(path, encoding = "utf-8") as markdown_file:
+        return convert(markdown_file.read(), cache, block_cache)
+
+def convert_many(documents, cache = None, block_cache = None):
+    # Yields (html, error) for every document of an iterable, so one bad
+    # document does not stop the rest. error is None on success.
+    for markdown in documents:
+        try:
+            yield convert(markdown, cache, block_cache), None
+        except Exception as e:
+            yield None, f"{type(e).__name__}: {e}"
+
+def read_nul_documents(stream):
+    # Yields the NUL terminated documents of a binary stream as bytes. read1
+    # returns whatever input is available, so each document is yielded as
+    # soon as its NUL arrives instead of when the stream ends. A last
+    # document without a NUL is yielded at the end of the stream.
+    read = stream.read1 if hasattr(stream, "read1") else stream.read
+    pending = bytearray()
+    while True:
+        chunk = read(READ_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        if b"\0" not in chunk:
+            continue
+        *documents, rest = pending.split(b"\0")
+        pending = bytearray(rest)
+        yield from documents
+    if len(pending) != 0:
+        yield bytes(pending)
+
+def run_nul_batch(stdin, stdout, cache = None, block_cache = None, log = None):
+    # Writes the HTML of every document followed by a NUL. A document that
+    # fails to convert gives an empty output, so outputs still line up with
+    # inputs, and its error goes to log. Returns the number of failures.
+    failures = 0
+    for number, document in enumerate(read_nul_documents(stdin), 1):
+        try:
+            html = convert(document.decode("utf-8"), cache, block_cache)
+        except Exception as e:
+            failures += 1
+            print(f"Document {number}: {type(e).__name__}: {e}", file = log or sys.stderr)
+            html = ""
+        stdout.write(html.encode("utf-8") + b"\0")
+        stdout.flush()
+    return failures
+
+def parse_request(line):
+    # A JSON lines request is a markdown string or an object with a
+    # "markdown" string and an optional "id" that is echoed back.
+    request = json.loads(line)
+    if isinstance(request, str):
+        return {}, request
+    if not isinstance(request, dict) or not isinstance(request.get("markdown"), str):
+        raise ValueError("Invalid request, expected a string or an object with markdown")
+    response = {}
+    if "id" in request:
+        response["id"] = request["id"]
+    return response, request["markdown"]
+
+def run_jsonl_batch(stdin, stdout, cache = None, block_cache = None):
+    # Reads one request per line and writes one {"html": ...} or
+    # {"error": ...} response line per request, in order. Blank lines are
+    # skipped. Returns the number of failures.
+    failures = 0
+    for line in stdin:
+        if line.strip() == b"":
+            continue
+        response = {}
+        try:
+            response, markdown = parse_request(line)
+            response["html"] = convert(markdown, cache, block_cache)
+        except Exception as e:
+            failures += 1
+            response["error"] = f"{type(e).__name__}: {e}"
+        stdout.write(json.dumps(response).encode("utf-8") + b"\n")
+        stdout.flush()
+    return failures
+
+def run_batch(batch_format, stdin, stdout, cache = None, block_cache = None):
+    # stdin and stdout are binary streams, e.g. sys.stdin.buffer.
+    if batch_format == "nul":
+        return run_nul_batch(stdin, stdout, cache, block_cache)
+    if batch_format == "jsonl":
+        return run_jsonl_batch(stdin, stdout, cache, block_cache)
+    raise ValueError(f"Invalid batch format: {batch_format}")
@@ -0,0 +1,93 @@
+import os
+import posixpath
+
+from markdown_blocks import (block_references,
+    iter_mapped_blocks)
+
+EXTERNAL_PREFIXES = ("mailto:", "tel:", "data:", "javascript:", "#", "//")
+
+def is_external(url):
+    return "://" in url or url.startswith(EXTERNAL_PREFIXES)
+
+def reference_path(url, page_path):
+    # Turns a link or image URL into a path relative to the site root, or
+    # None for external URLs.
+    url = url.strip().split("#", 1)[0].split("?", 1)[0]
+    if url == "" or is_external(url):
+        return None
+    page_dir = posixpath.dirname(page_path.replace(os.sep, "/"))
+    if url.startswith("/"):
+        path = url
+    else:
+        path = posixpath.join("/", page_dir, url)
+    trailing_slash = path.endswith("/")
+    path = posixpath.normpath(path).lstrip("/")
+    if trailing_slash and path not in ("", "."):
+        path += "/"
+    if path == ".":
+        path = ""
+    return path
+
+def page_candidates(path):
+    if path == "" or path.endswith("/"):
+        return [path + "index.md"]
+    if path.endswith(".html"):
+        return [path[:-len(".html")] + ".md"]
+    return [path + ".md", path + "/index.md"]
+
+def to_native(path):
+    return path.replace("/", os.sep)
+
+def extract_references(markdown):
+    # markdown is a string or a map_markdown buffer, which is scanned a block
+    # at a time instead of being decoded whole.
+    links = []
+    images = []
+    blocks = [markdown] if isinstance(markdown, str) else iter_mapped_blocks(markdown)
+    for block in blocks:
+        block_references(block, links, images)
+    return links, images
+
+def page_node(page_path, references, template_dependencies):
+    # references is the (links, images) pair from extract_references.
+    links, images = references
+    assets = []
+    for url in images:
+        path = reference_path(url, page_path)
+        if path is not None and to_native(path) not in assets:
+            assets.append(to_native(path))
+    return {
+        "template": list(template_dependencies),
+        "links": links,
+        "images": images,
+        "assets": assets,
+    }
+
+def page_needs_rebuild(node, template_dependencies, templates_changed, assets_changed):
+    if node is None:
+        return True
+    if node["template"] != list(template_dependencies):
+        return True
+    if any(dependency in templates_changed for dependency in template_dependencies):
+        return True
+    return any(asset in assets_changed for asset in node["assets"])
+
+def resolve_reference(url, page_path, pages, assets):
+    path = reference_path(url, page_path)
+    if path is None:
+        return "external"
+    for candidate in page_candidates(path):
+        if to_native(candidate) in pages:
+            return to_native(candidate)
+    if to_native(path) in assets:
+        return to_native(path)
+    return None
+
+def broken_links(graph, pages, assets):
+    ret = []
+    for page_path in sorted(graph):
+        node = graph[page_path]
+        for url in node["links"] + node["images"]:
+            if resolve_reference(url, page_path, pages, assets) is None:
+                ret.append((page_path, url))
+    return ret
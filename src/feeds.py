@@ -0,0 +1,208 @@
+import datetime
+import email.utils
+import html
+import io
+import json
+import os
+import posixpath
+from xml.sax.saxutils import escape
+
+from template import (breadcrumbs,
+    find_template,
+    load_template)
+from writer import write_if_changed
+from sync import remove_output
+
+FEED_SIZE = 20
+
+class PageIndex():
+    # Title, URL, date and front matter of every page, keyed by the page's
+    # path relative to the content root. Filled in while pages render and
+    # kept between builds, so only changed pages ever have to be read.
+
+    def __init__(self):
+        self.pages = {}
+        self.listings = []
+
+    def add(self, page, entry):
+        self.pages[page] = entry
+
+    def remove(self, page):
+        self.pages.pop(page, None)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path) as index_file:
+            try:
+                data = json.load(index_file)
+            except json.JSONDecodeError:
+                return
+        self.pages = data.get("pages", {})
+        self.listings = data.get("listings", [])
+
+    def save(self, path):
+        with open(path, mode = "w") as index_file:
+            json.dump({"pages": self.pages, "listings": self.listings}, index_file,
+                separators = (",", ":"), sort_keys = True)
+
+    def entries(self):
+        return [self.pages[page] for page in sorted(self.pages)]
+
+def parse_date(text):
+    try:
+        date = datetime.date.fromisoformat(text[:10])
+    except (TypeError, ValueError):
+        return None
+    return datetime.datetime(date.year, date.month, date.day, tzinfo = datetime.timezone.utc)
+
+def absolute_url(site_url, url):
+    return site_url.rstrip("/") + url
+
+def newest_first(entries):
+    # Feeds only carry pages with a parseable date, newest first.
+    dated = [(parse_date(entry["date"]), entry) for entry in entries]
+    dated = [(date, entry) for date, entry in dated if date is not None]
+    dated.sort(key = lambda item: (item[0], item[1]["url"]), reverse = True)
+    return dated
+
+def sitemap_xml(entries, site_url):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for entry in sorted(entries, key = lambda entry: entry["url"]):
+        lines.append(f"<url><loc>{escape(absolute_url(site_url, entry['url']))}</loc>")
+        if parse_date(entry["date"]) is not None:
+            lines[-1] += f"<lastmod>{escape(entry['date'][:10])}</lastmod>"
+        lines[-1] += "</url>"
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+def rss_xml(entries, site_url, title):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<rss version="2.0"><channel>',
+        f"<title>{escape(title)}</title>", f"<link>{escape(absolute_url(site_url, '/'))}</link>",
+        f"<description>{escape(title)}</description>"]
+    for date, entry in newest_first(entries)[:FEED_SIZE]:
+        link = escape(absolute_url(site_url, entry["url"]))
+        lines.append(f"<item><title>{escape(entry['title'])}</title><link>{link}</link>"
+            f"<guid>{link}</guid><pubDate>{email.utils.format_datetime(date)}</pubDate>")
+        if entry["meta"].get("description"):
+            lines[-1] += f"<description>{escape(entry['meta']['description'])}</description>"
+        lines[-1] += "</item>"
+    lines.append("</channel></rss>")
+    return "\n".join(lines) + "\n"
+
+def atom_xml(entries, site_url, title):
+    dated = newest_first(entries)[:FEED_SIZE]
+    updated = dated[0][0] if len(dated) != 0 else parse_date("1970-01-01")
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{escape(title)}</title>",
+        f'<link href="{escape(absolute_url(site_url, "/"))}"/>',
+        f"<id>{escape(absolute_url(site_url, '/'))}</id>",
+        f"<updated>{updated.isoformat()}</updated>"]
+    for date, entry in dated:
+        link = escape(absolute_url(site_url, entry["url"]))
+        lines.append(f'<entry><title>{escape(entry["title"])}</title><link href="{link}"/>'
+            f"<id>{link}</id><updated>{date.isoformat()}</updated>")
+        if entry["meta"].get("author"):
+            lines[-1] += f"<author><name>{escape(entry['meta']['author'])}</name></author>"
+        if entry["meta"].get("description"):
+            lines[-1] += f"<summary>{escape(entry['meta']['description'])}</summary>"
+        lines[-1] += "</entry>"
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+def section_of(page):
+    return posixpath.dirname(page.replace(os.sep, "/"))
+
+def section_listings(entries):
+    # Sections (content directories, "/" separated) without an index page
+    # of their own, mapped to the pages and subsections they contain.
+    sections = {}
+    indexed = set()
+    for entry in entries:
+        section = section_of(entry["path"])
+        if posixpath.basename(entry["path"].replace(os.sep, "/")) == "index.md":
+            indexed.add(section)
+        sections.setdefault(section, {"pages": [], "sections": []})["pages"].append(entry)
+        while section != "":
+            parent = posixpath.dirname(section)
+            children = sections.setdefault(parent, {"pages": [], "sections": []})["sections"]
+            if section in children:
+                break
+            children.append(section)
+            section = parent
+    return {section: listing for section, listing in sections.items()
+        if section != "" and section not in indexed}
+
+def listing_html(section, listing):
+    items = []
+    for child in sorted(listing["sections"]):
+        name = html.escape(posixpath.basename(child))
+        items.append(f'<li><a href="/{html.escape(child)}/">{name}/</a></li>')
+    pages = sorted(listing["pages"], key = lambda entry: (entry["date"], entry["url"]),
+        reverse = True)
+    for entry in pages:
+        items.append(f'<li><a href="{html.escape(entry["url"])}">{html.escape(entry["title"])}'
+            f"</a> <time>{html.escape(entry['date'])}</time></li>")
+    title = html.escape(posixpath.basename(section))
+    return f"<div><h1>{title}</h1><ul>{''.join(items)}</ul></div>"
+
+def listing_entry(section, listing):
+    dates = [entry["date"] for entry in listing["pages"]]
+    return {
+        "path": os.path.join(section.replace("/", os.sep), "index.md"),
+        "url": f"/{section}/",
+        "title": posixpath.basename(section),
+        "date": max(dates) if len(dates) != 0 else "",
+        "meta": {},
+    }
+
+def write_listings(page_index, listings, public_dir, content_dir, template_path):
+    # Renders an index.html listing for every section without an index.md
+    # and removes listings that are no longer needed. Returns the listing
+    # paths that changed.
+    changed = []
+    for section, listing in sorted(listings.items()):
+        entry = listing_entry(section, listing)
+        page_template = find_template(os.path.join(content_dir, entry["path"]), content_dir,
+            template_path)
+        variables = {
+            "Title": entry["title"],
+            "Date": entry["date"],
+            "Content": listing_html(section, listing),
+            "Path": entry["url"],
+            "Breadcrumbs": breadcrumbs(entry["url"]),
+        }
+        out = io.StringIO()
+        load_template(page_template).render(out, variables)
+        path = os.path.join(public_dir, entry["path"][:-len(".md")] + ".html")
+        if write_if_changed(path, out.getvalue().encode("utf-8")):
+            changed.append(path)
+    for section in page_index.listings:
+        page = os.path.join(section.replace("/", os.sep), "index.md")
+        # A section that gained an index.md now has a real page there.
+        if section not in listings and page not in page_index.pages:
+            remove_output(os.path.join(public_dir, page[:-len(".md")] + ".html"), public_dir)
+    page_index.listings = sorted(listings)
+    return changed
+
+def write_feeds(page_index, public_dir, site_url, title, content_dir, template_path):
+    # Writes sitemap.xml, rss.xml, atom.xml and the section listings from
+    # the page index alone. Files whose contents did not change are left
+    # untouched. Returns the paths that were written.
+    entries = page_index.entries()
+    listings = section_listings(entries)
+    listed = [listing_entry(section, listing) for section, listing in sorted(listings.items())]
+    outputs = {
+        "sitemap.xml": sitemap_xml(entries + listed, site_url),
+        "rss.xml": rss_xml(entries, site_url, title),
+        "atom.xml": atom_xml(entries, site_url, title),
+    }
+    changed = []
+    for name, text in outputs.items():
+        path = os.path.join(public_dir, name)
+        if write_if_changed(path, text.encode("utf-8")):
+            changed.append(path)
+    changed.extend(write_listings(page_index, listings, public_dir, content_dir, template_path))
+    return changed
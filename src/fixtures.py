@@ -0,0 +1,13 @@
+import os
+
+# Helpers shared by the test modules.
+
+def write_file(path, data):
+    # data is text, or bytes for binary files.
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    with open(path, mode = "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
@@ -0,0 +1,103 @@
+import datetime
+import os
+import re
+
+from template import page_url
+
+FRONT_MATTER_DELIMITER = "---"
+TITLE_RE = re.compile(r"# .+")
+
+def is_delimiter(line):
+    return line.rstrip() == FRONT_MATTER_DELIMITER
+
+def text_lines(text):
+    # Lazily yields the lines of text, so reading a header does not split
+    # the whole document.
+    position = 0
+    while True:
+        end = text.find("\n", position)
+        if end == -1:
+            yield text[position:]
+            return
+        yield text[position:end]
+        position = end + 1
+
+def parse_front_matter_line(line, metadata):
+    line = line.strip()
+    if line == "" or line.startswith("#"):
+        return
+    key, separator, value = line.partition(":")
+    key = key.strip().lower()
+    if separator == "" or key == "":
+        raise ValueError(f"Invalid front matter line: {line}")
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        value = value[1:-1]
+    metadata[key] = value
+
+def read_header(lines):
+    # Reads the front matter and the title line from an iterable of lines,
+    # such as an open file, and stops there without touching the body.
+    # Returns (metadata, title_line); without front matter the title line
+    # is the first line, with it the first non-blank line after it.
+    lines = iter(lines)
+    first = next(lines, "")
+    if not is_delimiter(first):
+        return {}, first.rstrip("\n")
+    metadata = {}
+    for line in lines:
+        if is_delimiter(line):
+            break
+        parse_front_matter_line(line, metadata)
+    else:
+        raise ValueError("Invalid markdown, front matter not closed")
+    for line in lines:
+        if line.strip() != "":
+            return metadata, line.rstrip("\n")
+    return metadata, ""
+
+def skip_front_matter(lines):
+    # Yields the body lines that follow the front matter, if there is any.
+    lines = iter(lines)
+    for line in lines:
+        if is_delimiter(line):
+            for line in lines:
+                if is_delimiter(line):
+                    break
+            else:
+                raise ValueError("Invalid markdown, front matter not closed")
+        else:
+            yield line
+        break
+    yield from lines
+
+def header_title(metadata, title_line):
+    if metadata.get("title"):
+        return metadata["title"]
+    header = TITLE_RE.match(title_line)
+    if header is None:
+        raise ValueError("Invalid markdown, no title provided")
+    return header.group(0).lstrip("# ")
+
+def page_date(path, metadata):
+    if metadata.get("date"):
+        return metadata["date"]
+    return datetime.date.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+def scan_page(path, content_root):
+    # Metadata-only view of a page: reads the front matter and title line
+    # and never parses the body.
+    with open(path) as markdown_file:
+        header = read_header(markdown_file)
+    return page_entry(path, content_root, header)
+
+def page_entry(path, content_root, header):
+    metadata, title_line = header
+    page = os.path.relpath(path, content_root)
+    return {
+        "path": page,
+        "url": page_url(page),
+        "title": header_title(metadata, title_line),
+        "date": page_date(path, metadata),
+        "meta": metadata,
+    }
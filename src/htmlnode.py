@@ -1,5 +1,9 @@
+import io
+
 class HTMLNode():
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag = None, value = None, children = None, props = None):
         self.tag = tag
         self.value = value
@@ -9,6 +13,9 @@ class HTMLNode():
     def to_html(self):
         raise NotImplementedError("to_html method not implemented") 
 
+    def write_html(self, out):
+        raise NotImplementedError("write_html method not implemented")
+
     def props_to_html(self):
         if self.props is None:
             return ""
@@ -30,6 +37,8 @@ class HTMLNode():
 
 class LeafNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props = None):
         super().__init__(tag, value, None, props)
 
@@ -40,24 +49,33 @@ class LeafNode(HTMLNode):
             return str(self.value)
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def write_html(self, out):
+        out.write(self.to_html())
+
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 class ParentNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props = None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        out = io.StringIO()
+        self.write_html(out)
+        return out.getvalue()
+
+    def write_html(self, out):
         if self.tag is None:
             raise ValueError("ParentNodes must have a tag")
         if self.children is None:
             raise ValueError("ParentNodes must have children")
-        ret = f"<{self.tag}{self.props_to_html()}>"
+        out.write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            ret += child.to_html()
-        ret += f"</{self.tag}>"
-        return ret
+            child.write_html(out)
+        out.write(f"</{self.tag}>")
     
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
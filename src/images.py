@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from depgraph import (reference_path,
+    to_native)
+from htmlnode import ParentNode
+from manifest import hash_file
+from sync import (remove_output,
+    transfer_file)
+
+try:
+    import PIL
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Animated GIFs and SVGs are left to the plain static copy.
+IMAGE_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+OUTPUT_FORMATS = {"png": (".png", "PNG"), "jpeg": (".jpg", "JPEG"), "webp": (".webp", "WEBP")}
+DEFAULT_WIDTHS = (480, 960, 1600)
+HASH_LENGTH = 12
+# Cached outputs are named as if the image were CACHE_NAME plus its
+# extension, publish_images names them after the image's current path.
+CACHE_NAME = "image"
+IMG_SRC_RE = re.compile(r'<img src="([^"]*)"')
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_FORMATS
+
+def hashed_path(path, digest, width = None, extension = None):
+    root, ext = os.path.splitext(path)
+    if extension is None:
+        extension = ext
+    suffix = "" if width is None else f".{width}w"
+    return f"{root}.{digest[:HASH_LENGTH]}{suffix}{extension}"
+
+def localize_entry(entry, path):
+    # Maps an entry with cached names to the names published for path, and
+    # returns it with the {published path: cached name} of its files.
+    root = os.path.splitext(path)[0]
+    files = {}
+    def localize(name):
+        output = root + name[len(CACHE_NAME):]
+        files[output] = name
+        return output
+    ret = {"src": localize(entry["src"]),
+        "srcset": [[localize(name), width] for name, width in entry["srcset"]]}
+    return ret, files
+
+def entry_files(entry):
+    ret = [entry["src"]]
+    for path, _ in entry["srcset"]:
+        if path not in ret:
+            ret.append(path)
+    return ret
+
+def cached_entry(cache_path):
+    # The entry in cache_path, or None when it is unreadable or any of its
+    # outputs went missing, so the image is rendered again.
+    try:
+        with open(os.path.join(cache_path, "entry.json")) as entry_file:
+            entry = json.load(entry_file)
+    except (OSError, ValueError):
+        return None
+    for output in entry_files(entry):
+        if not os.path.isfile(os.path.join(cache_path, os.path.basename(output))):
+            return None
+    return entry
+
+class ImagePipeline():
+
+    def __init__(self, cache_dir, widths = DEFAULT_WIDTHS, image_format = None, quality = 80):
+        # image_format converts every image to one of OUTPUT_FORMATS, None
+        # keeps each image's own format.
+        if image_format is not None and image_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Invalid image format: {image_format}")
+        self.cache_dir = cache_dir
+        self.widths = tuple(sorted(set(widths)))
+        self.image_format = image_format
+        self.quality = quality
+
+    def settings(self):
+        pillow = None if Image is None else PIL.__version__
+        return json.dumps([list(self.widths), self.image_format, self.quality, pillow])
+
+    def cache_path(self, digest, extension):
+        # The extension picks the output format when converting is off.
+        key = hashlib.sha256((self.settings() + extension.lower() + digest).encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def process(self, source_path, path):
+        # Returns the entry for the image at path (relative to the static
+        # root) and the cached file of each of its outputs. Outputs are keyed
+        # by the input hash and the settings, not the path, so an unchanged
+        # image is only ever processed once, even when moved or copied.
+        digest = hash_file(source_path)
+        extension = os.path.splitext(path)[1]
+        cache_path = self.cache_path(digest, extension)
+        entry = cached_entry(cache_path)
+        if entry is not None:
+            return self.localize(entry, path, cache_path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok = True)
+        tmp_path = tempfile.mkdtemp(dir = os.path.dirname(cache_path), suffix = ".tmp")
+        try:
+            entry = self.render(source_path, CACHE_NAME + extension, digest, tmp_path)
+            with open(os.path.join(tmp_path, "entry.json"), mode = "w") as entry_file:
+                json.dump(entry, entry_file)
+            # Another worker may have finished the same image first.
+            try:
+                os.rename(tmp_path, cache_path)
+            except OSError:
+                if cached_entry(cache_path) is not None:
+                    shutil.rmtree(tmp_path)
+                else:
+                    shutil.rmtree(cache_path)
+                    os.rename(tmp_path, cache_path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors = True)
+            raise
+        return self.localize(entry, path, cache_path)
+
+    def localize(self, entry, path, cache_path):
+        entry, files = localize_entry(entry, path)
+        return entry, {output: os.path.join(cache_path, name) for output, name in files.items()}
+
+    def render(self, source_path, path, digest, out_dir):
+        if Image is None:
+            src = hashed_path(path, digest)
+            shutil.copyfile(source_path, os.path.join(out_dir, os.path.basename(src)))
+            return {"src": src, "srcset": []}
+        extension = os.path.splitext(path)[1].lower()
+        image_format = IMAGE_FORMATS[extension]
+        if self.image_format is not None:
+            extension, image_format = OUTPUT_FORMATS[self.image_format]
+        src = hashed_path(path, digest, extension = extension)
+        srcset = []
+        with Image.open(source_path) as image:
+            image.load()
+            src_path = os.path.join(out_dir, os.path.basename(src))
+            self.save(image, src_path, image_format)
+            # Never ship a re-encode that is bigger than what we started with.
+            if (extension == os.path.splitext(path)[1].lower()
+                    and os.path.getsize(src_path) > os.path.getsize(source_path)):
+                shutil.copyfile(source_path, src_path)
+            for width in self.widths:
+                if width >= image.width:
+                    break
+                height = max(1, round(image.height * width / image.width))
+                variant = hashed_path(path, digest, width, extension)
+                self.save(image.resize((width, height), Image.LANCZOS),
+                    os.path.join(out_dir, os.path.basename(variant)), image_format)
+                srcset.append([variant, width])
+            if len(srcset) != 0:
+                srcset.append([src, image.width])
+        return {"src": src, "srcset": srcset}
+
+    def save(self, image, path, image_format):
+        options = {"optimize": True}
+        if image_format in ("JPEG", "WEBP"):
+            options["quality"] = self.quality
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(path, image_format, **options)
+
+def publish_images(static_dir, public_dir, entries, pipeline, previous = None, method = "copy"):
+    # entries are the static entries from stat_tree or sync_static and
+    # previous the images published by the last build. Returns the images
+    # published now, keyed by their path relative to the static root.
+    if previous is None:
+        previous = {}
+    images = {}
+    for path, stat in entries.items():
+        if not is_image(path):
+            continue
+        entry = previous.get(path)
+        if (entry is not None and entry["source"] == stat
+                and entry["settings"] == pipeline.settings()
+                and all(os.path.exists(os.path.join(public_dir, output))
+                    for output in entry_files(entry))):
+            images[path] = entry
+            continue
+        entry, files = pipeline.process(os.path.join(static_dir, path), path)
+        entry["source"] = stat
+        entry["settings"] = pipeline.settings()
+        for output in entry_files(entry):
+            public_path = os.path.join(public_dir, output)
+            # Names are content hashed, an existing file already has the
+            # right contents.
+            if os.path.exists(public_path):
+                continue
+            os.makedirs(os.path.dirname(public_path), exist_ok = True)
+            print(f"Publishing image {public_path}")
+            transfer_file(files[output], public_path, method)
+        images[path] = entry
+    outputs = set(output for entry in images.values() for output in entry_files(entry))
+    for entry in previous.values():
+        for output in entry_files(entry):
+            if output not in outputs:
+                remove_output(os.path.join(public_dir, output), public_dir)
+    return images
+
+def image_url(path):
+    return "/" + path.replace(os.sep, "/")
+
+def image_attributes(url, page_path, images):
+    path = reference_path(url, page_path)
+    if path is None:
+        return None
+    entry = images.get(to_native(path))
+    if entry is None:
+        return None
+    props = {"src": image_url(entry["src"])}
+    if len(entry["srcset"]) != 0:
+        props["srcset"] = ", ".join(f"{image_url(variant)} {width}w"
+            for variant, width in entry["srcset"])
+    return props
+
+def rewrite_images(content, page_path, images):
+    # content is the page's HTMLNode tree, or its rendered HTML when the body
+    # came from the render cache. Both come out with the same attributes.
+    if isinstance(content, str):
+        def replace(match):
+            props = image_attributes(match.group(1), page_path, images)
+            if props is None:
+                return match.group(0)
+            return "<img" + "".join(f' {name}="{value}"' for name, value in props.items())
+        return IMG_SRC_RE.sub(replace, content)
+    if isinstance(content, ParentNode):
+        for child in content.children:
+            rewrite_images(child, page_path, images)
+    elif content.tag == "img":
+        props = image_attributes(content.props["src"], page_path, images)
+        if props is not None:
+            del content.props["src"]
+            props.update(content.props)
+            content.props = props
+    return content
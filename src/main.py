@@ -1,27 +1,94 @@
+import argparse
+import json
+import io
 import os
 import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-from markdown_blocks import (markdown_to_html_node,
-    extract_title)
+from convert import (BATCH_FORMATS,
+    run_batch)
+from markdown_blocks import (MarkdownFile,
+    collect_text,
+    markdown_to_html,
+    markdown_to_html_node,
+    iter_buffer_lines,
+    map_markdown)
+from frontmatter import (header_title,
+    page_date,
+    read_header,
+    page_entry,
+    scan_page,
+    text_lines)
+from cache import (BlockCache,
+    RenderCache)
+from compress import (minify_html,
+    precompress_tree)
+from images import (DEFAULT_WIDTHS,
+    OUTPUT_FORMATS,
+    ImagePipeline,
+    publish_images,
+    rewrite_images)
+from feeds import (PageIndex,
+    write_feeds)
+from depgraph import (broken_links,
+    extract_references,
+    page_needs_rebuild,
+    page_node)
+from manifest import (build_manifest,
+    diff_entries,
+    empty_manifest,
+    hash_files,
+    list_files,
+    load_manifest,
+    save_manifest)
+from profiling import (BuildProfile,
+    StageClock,
+    profiled_markdown_to_html,
+    profiled_markdown_to_html_node)
+from search import (SearchIndex,
+    search_document)
+from server import serve
+from worker import serve_renderer
+from shard import (build_fingerprint,
+    check_shards,
+    merge_shards,
+    parse_shard,
+    select_shard,
+    write_shard_manifest)
+from sync import (LINK_METHODS,
+    remove_output,
+    stat_tree,
+    sync_static)
+from writer import (OutputWriter,
+    make_dirs)
+from template import (DIRECTORY_TEMPLATE_NAME,
+    breadcrumbs,
+    find_template,
+    load_template,
+    page_url)
 
-def cp_static_to_public():
-    rm_public()
-    path_list = os.listdir("./static")
+def cp_static_to_public(static_dir = "./static", public_dir = "./public"):
+    rm_public(public_dir)
+    path_list = os.listdir(static_dir)
     for path in path_list:
-        recursive_cp(path)
+        recursive_cp(path, static_dir, public_dir)
 
-def rm_public():
-    remove_list = os.listdir("./public")
+def rm_public(public_dir = "./public"):
+    if not os.path.exists(public_dir):
+        os.makedirs(public_dir)
+        return
+    remove_list = os.listdir(public_dir)
     for path in remove_list:
-        full_path = os.path.join("./public", path)
+        full_path = os.path.join(public_dir, path)
         if os.path.isfile(full_path):
             os.remove(full_path)
         else:
             shutil.rmtree(full_path)
     
-def recursive_cp(path):
-    static_path = os.path.join("./static", path)
-    public_path = os.path.join("./public", path)
+def recursive_cp(path, static_dir = "./static", public_dir = "./public"):
+    static_path = os.path.join(static_dir, path)
+    public_path = os.path.join(public_dir, path)
     if os.path.isfile(static_path):
         print(f"Copying from {static_path} to {public_path}")
         shutil.copy(static_path, public_path)
@@ -31,25 +98,169 @@ def recursive_cp(path):
             os.mkdir(public_path)
         path_list = os.listdir(static_path)
         for child_path in path_list:
-            recursive_cp(os.path.join(path, child_path))
+            recursive_cp(os.path.join(path, child_path), static_dir, public_dir)
 
-def generate_page(from_path, template_path, dest_path):
+# Sources at least this large are rendered block by block straight from
+# disk instead of being read, cached and parsed as one string.
+STREAM_THRESHOLD = 16 * 1024 * 1024
+MMAP_THRESHOLD = 1024 * 1024
+
+def is_page_source(path):
+    # path is relative to the content root. Anything under a "_" directory
+    # is a partial or template, as discover_pages skips those directories.
+    return not any(part.startswith("_") for part in path.split(os.sep))
+
+def page_variables(from_path, header, html_node, content_root = None):
+    # header is the (metadata, title_line) pair from read_header. Front
+    # matter keys are available to templates under their own names.
+    metadata, title_line = header
+    variables = dict(metadata)
+    variables.update({
+        "Title": header_title(metadata, title_line),
+        "Date": page_date(from_path, metadata),
+        "Content": html_node,
+    })
+    if content_root is not None:
+        url = page_url(os.path.relpath(from_path, content_root))
+        variables["Path"] = url
+        variables["Breadcrumbs"] = breadcrumbs(url)
+    return variables
+
+def generate_page(from_path, template_path, dest_path, content_root = None, timings = None,
+        cache = None, writer = None, search = False, images = None, minify = False,
+        block_cache = None, references = False):
+    # timings, when given, collects seconds spent per stage for this page.
+    # Returns the page's entry for the PageIndex (None without a
+    # content_root), with search set its search document and with
+    # references set the (links, images) of its markdown. images maps
+    # static paths to their published variants, see publish_images.
+    clock = StageClock(timings)
+    if content_root is not None:
+        template_path = find_template(from_path, content_root, template_path)
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    with open(from_path) as markdown_file:
-        markdown = markdown_file.read()
-    with open(template_path) as template_file:
-        template = template_file.read()
-    html_node = markdown_to_html_node(markdown)
-    html = html_node.to_html()
-    title = extract_title(markdown)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
+    if os.path.getsize(from_path) >= STREAM_THRESHOLD:
+        with clock("stream"):
+            with open(from_path) as markdown_file:
+                header = read_header(markdown_file)
+            variables = generate_streamed_page(from_path, header,
+                load_template(template_path), dest_path, content_root, block_cache)
+        document = None
+        if search:
+            document = search_document(variables.get("Path", dest_path), variables["Title"], None)
+        page_references = None
+        if references:
+            page_references = (variables["Content"].links, variables["Content"].images)
+        return index_entry(from_path, content_root, header), document, page_references
+    with clock("read"):
+        source = read_markdown(from_path)
+    with clock("template"):
+        template = load_template(template_path)
+    page_references = None
+    text = ([], []) if search else None
+    if isinstance(source, str):
+        header = read_header(text_lines(source))
+        html_node = render_markdown(source, timings, cache, block_cache, text)
+        if references:
+            page_references = extract_references(source)
+    else:
+        # Once the body is rendered only the header is needed.
+        with source:
+            header = read_header(iter_buffer_lines(source))
+            html_node = render_markdown(source, timings, cache, block_cache, text)
+            if references:
+                page_references = extract_references(source)
+    if images:
+        with clock("images"):
+            page_path = from_path
+            if content_root is not None:
+                page_path = os.path.relpath(from_path, content_root)
+            html_node = rewrite_images(html_node, page_path, images)
+    variables = page_variables(from_path, header, html_node, content_root)
+    document = None
+    if search:
+        with clock("search"):
+            document = search_document(variables.get("Path", dest_path), variables["Title"],
+                text)
     dest_dir = os.path.dirname(dest_path)
     dest_path = dest_path.replace(".md", ".html")
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
+    if timings is None and writer is None and not minify:
+        os.makedirs(dest_dir, exist_ok = True)
+        with open(dest_path, mode = "w") as html_file:
+            template.render(html_file, variables)
+        return index_entry(from_path, content_root, header), document, page_references
+    with clock("serialize"):
+        out = io.StringIO()
+        template.render(out, variables)
+        html = out.getvalue()
+    if minify:
+        with clock("minify"):
+            html = minify_html(html)
+    with clock("write"):
+        if writer is not None:
+            writer.submit(dest_path, html)
+        else:
+            os.makedirs(dest_dir, exist_ok = True)
+            with open(dest_path, mode = "w") as html_file:
+                html_file.write(html)
+    return index_entry(from_path, content_root, header), document, page_references
+
+def index_entry(from_path, content_root, header):
+    if content_root is None:
+        return None
+    return page_entry(from_path, content_root, header)
+
+def read_markdown(path):
+    # Large sources are memory mapped so blocks are decoded one at a time
+    # instead of holding the whole file and its split copies in memory.
+    if os.path.getsize(path) >= MMAP_THRESHOLD:
+        buffer = map_markdown(path)
+        if buffer is not None:
+            return buffer
+    with open(path) as markdown_file:
+        return markdown_file.read()
+
+def render_markdown(markdown, timings = None, cache = None, block_cache = None, text = None):
+    # Returns the page body as an HTMLNode tree, or as HTML when a cache or
+    # a block_cache is used. markdown is a string or a map_markdown buffer.
+    # text, when given, is a (headings, body) pair of empty lists that gets
+    # the body's text, taken from the caches or the tree and never parsed
+    # back out of the HTML.
+    clock = StageClock(timings)
+    html_node = None
+    if cache is not None:
+        with clock("cache"):
+            html_node = cache.get(markdown, text)
+    if html_node is None and block_cache is not None:
+        if timings is None:
+            html_node = markdown_to_html(markdown, block_cache, text)
+        else:
+            html_node = profiled_markdown_to_html(markdown, timings, block_cache, text)
+        if cache is not None:
+            cache.put(markdown, html_node, text)
+    if html_node is None:
+        if timings is None:
+            html_node = markdown_to_html_node(markdown)
+        else:
+            html_node = profiled_markdown_to_html_node(markdown, timings)
+        if text is not None:
+            with clock("search"):
+                collect_text(html_node, text[1], text[0])
+        if cache is not None:
+            with clock("serialize"):
+                html_node = html_node.to_html()
+            cache.put(markdown, html_node, text)
+    return html_node
+
+def generate_streamed_page(from_path, header, template, dest_path, content_root = None,
+        block_cache = None):
+    variables = page_variables(from_path, header, MarkdownFile(from_path, block_cache),
+        content_root)
+    dest_dir = os.path.dirname(dest_path)
+    dest_path = dest_path.replace(".md", ".html")
+    os.makedirs(dest_dir, exist_ok = True)
     with open(dest_path, mode = "w") as html_file:
-        html_file.write(template)
+        template.render(html_file, variables)
+    return variables
 
 def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
     if os.path.isfile(dir_path_content):
@@ -61,9 +272,448 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
             full_dest_path = os.path.join(dest_dir_path, child_path)
             generate_pages_recursive(full_child_path, template_path, full_dest_path)
 
-def main():
-    cp_static_to_public()
-    generate_pages_recursive("./content", "./template.html", "./public")
+def discover_pages(dir_path_content, dest_dir_path):
+    if os.path.isfile(dir_path_content):
+        return [(dir_path_content, dest_dir_path)]
+    pages = []
+    for child_path in sorted(os.listdir(dir_path_content)):
+        if not is_page_source(child_path):
+            continue
+        full_child_path = os.path.join(dir_path_content, child_path)
+        full_dest_path = os.path.join(dest_dir_path, child_path)
+        pages.extend(discover_pages(full_child_path, full_dest_path))
+    return pages
+
+def scan_pages(content_dir):
+    # Title, date and front matter of every page without parsing any body.
+    return [scan_page(from_path, content_dir)
+        for from_path, _ in discover_pages(content_dir, content_dir)]
+
+_block_cache = None
+
+def process_block_cache(max_bytes):
+    # One per process, so every batch a worker renders shares it, and so do
+    # the rebuilds of --serve.
+    global _block_cache
+    if _block_cache is None or _block_cache.max_bytes != max_bytes:
+        _block_cache = BlockCache(max_bytes)
+    return _block_cache
+
+def render_batch_job(batch):
+    # Returns the per page results, the write errors and the number of
+    # block cache hits and misses of this batch.
+    options, pages = batch
+    (template_path, content_root, profile, cache, writers, search, images, minify,
+        block_cache_bytes, references) = options
+    writer = None
+    if writers > 0:
+        writer = OutputWriter(writers)
+    block_cache = None
+    block_counts = (0, 0)
+    if block_cache_bytes > 0:
+        block_cache = process_block_cache(block_cache_bytes)
+        block_counts = block_cache.counts()
+    results = []
+    for from_path, dest_path in pages:
+        timings = {} if profile else None
+        try:
+            entry, document, page_references = generate_page(from_path, template_path,
+                dest_path, content_root, timings, cache, writer, search, images, minify,
+                block_cache, references)
+        except Exception as e:
+            results.append((f"{from_path}: {type(e).__name__}: {e}", timings, None, None, None))
+            continue
+        results.append((None, timings, document, entry, page_references))
+    write_errors = []
+    if writer is not None:
+        write_errors = writer.close()
+    if block_cache is not None:
+        hits, misses = block_cache.counts()
+        block_counts = (hits - block_counts[0], misses - block_counts[1])
+    return results, write_errors, block_counts
 
-main()
+def generate_pages(pages, template_path, jobs = 1, content_root = None, profile = None,
+        cache = None, writers = 0, search_index = None, images = None, minify = False,
+        page_index = None, block_cache_bytes = 0, references = None):
+    # writers > 0 hands rendered pages to that many background writer
+    # threads per batch so rendering overlaps with filesystem I/O.
+    # block_cache_bytes > 0 renders through a BlockCache of that size in
+    # every worker process. references, when given, is filled with the
+    # (links, images) of every page rendered.
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    options = (template_path, content_root, profile is not None, cache, writers,
+        search_index is not None, images, minify, block_cache_bytes, references is not None)
+    make_dirs(dest_path for _, dest_path in pages)
+    if jobs == 1 or len(pages) < 2:
+        batches = [(options, pages)]
+        batch_results = [render_batch_job(batches[0])]
+    else:
+        batch_size = max(1, -(-len(pages) // (jobs * 4)))
+        batches = [(options, pages[i:i + batch_size])
+            for i in range(0, len(pages), batch_size)]
+        with ProcessPoolExecutor(max_workers = jobs) as executor:
+            batch_results = list(executor.map(render_batch_job, batches))
+    errors = []
+    block_hits = block_misses = 0
+    for (_, batch_pages), (results, write_errors, block_counts) in zip(batches, batch_results):
+        block_hits += block_counts[0]
+        block_misses += block_counts[1]
+        for (from_path, _), (error, timings, document, entry, page_references) in zip(
+                batch_pages, results):
+            if error is not None:
+                errors.append(error)
+            if profile is not None:
+                profile.record(from_path, timings)
+            page = from_path
+            if content_root is not None:
+                page = os.path.relpath(from_path, content_root)
+            if document is not None:
+                search_index.add(page, document)
+            if entry is not None and page_index is not None:
+                page_index.add(page, entry)
+            if page_references is not None:
+                references[page] = page_references
+        errors.extend(write_errors)
+    if profile is not None:
+        profile.record_blocks(block_hits, block_misses)
+    elif block_hits + block_misses != 0:
+        print(f"Block cache: reused {block_hits} of {block_hits + block_misses} blocks")
+    if cache is not None:
+        cache.evict()
+    if len(errors) != 0:
+        raise RuntimeError(f"{len(errors)} page(s) failed to build:\n" + "\n".join(errors))
+
+def template_dependencies(content_dir, template_path):
+    template_paths = [template_path]
+    for path in list_files(content_dir):
+        if os.path.basename(path) == DIRECTORY_TEMPLATE_NAME:
+            template_paths.append(os.path.join(content_dir, path))
+    dependencies = []
+    for path in template_paths:
+        for dependency in load_template(path).dependencies:
+            if dependency not in dependencies:
+                dependencies.append(dependency)
+    return dependencies
+
+def incremental_build(content_dir, template_path, static_dir, public_dir, manifest_path,
+        jobs = 1, profile = None, link_method = "copy", cache = None, writers = 0,
+        search_index = None, image_pipeline = None, minify = False, page_index = None,
+        block_cache_bytes = 0):
+    # Returns the (page, url) pairs of internal links that point nowhere.
+    # search_index and page_index should hold the entries of the previous
+    # build, pages rendered now replace their entries and removed pages are
+    # dropped.
+    old = load_manifest(manifest_path)
+    new = build_manifest(content_dir, old)
+    if old is None:
+        old = empty_manifest()
+    if not os.path.exists(public_dir):
+        os.makedirs(public_dir)
+    new["options"] = {"minify": minify}
+    options_changed = new["options"] != old["options"]
+
+    new["static"] = sync_static(static_dir, public_dir, old["static"], link_method, minify)
+    assets_changed = set(path for path, entry in new["static"].items()
+        if old["static"].get(path) != entry)
+    assets_changed.update(path for path in old["static"] if path not in new["static"])
+    if image_pipeline is not None:
+        new["images"] = publish_images(static_dir, public_dir, new["static"], image_pipeline,
+            old["images"], link_method)
+    else:
+        publish_images(static_dir, public_dir, {}, None, old["images"])
+    # A page embedding an image must be rebuilt whenever the image's
+    # published names change, e.g. when the pipeline settings change.
+    assets_changed.update(path for path, entry in new["images"].items()
+        if old["images"].get(path) != entry)
+    assets_changed.update(path for path in old["images"] if path not in new["images"])
+
+    pages_changed, pages_removed = diff_entries(old["content"], new["content"])
+    for path in pages_removed:
+        if not is_page_source(path):
+            continue
+        dest_path = os.path.join(public_dir, path).replace(".md", ".html")
+        remove_output(dest_path, public_dir)
+        if search_index is not None:
+            search_index.remove(path)
+        if page_index is not None:
+            page_index.remove(path)
+
+    page_templates = {}
+    for path in new["content"]:
+        if not is_page_source(path):
+            continue
+        page_template = find_template(os.path.join(content_dir, path), content_dir, template_path)
+        page_templates[path] = load_template(page_template).dependencies
+    template_paths = sorted(set(dependency for dependencies in page_templates.values()
+        for dependency in dependencies))
+    new["templates"] = hash_files(template_paths)
+    templates_changed = set(path for path, digest in new["templates"].items()
+        if old["templates"].get(path) != digest)
+
+    pages = []
+    for path, dependencies in page_templates.items():
+        from_path = os.path.join(content_dir, path)
+        dest_path = os.path.join(public_dir, path)
+        node = old["graph"].get(path)
+        if (options_changed or path in pages_changed
+                or not os.path.exists(dest_path.replace(".md", ".html"))
+                or page_needs_rebuild(node, dependencies, templates_changed, assets_changed)
+                or search_index is not None and path not in search_index.documents):
+            pages.append((from_path, dest_path))
+        else:
+            new["graph"][path] = node
+    pages = sorted(pages)
+    if page_index is not None:
+        # Pages that are not rendered now but are missing from the index
+        # only need their header read.
+        rendered = set(from_path for from_path, _ in pages)
+        for path in page_templates:
+            from_path = os.path.join(content_dir, path)
+            if path not in page_index.pages and from_path not in rendered:
+                page_index.add(path, scan_page(from_path, content_dir))
+    # The graph nodes of rendered pages come from the links and images
+    # found while rendering them.
+    references = {}
+    generate_pages(pages, template_path, jobs, content_dir, profile, cache,
+        writers, search_index, new["images"], minify, page_index, block_cache_bytes, references)
+    for path, page_references in references.items():
+        new["graph"][path] = page_node(path, page_references, page_templates[path])
+
+    save_manifest(new, manifest_path)
+    return broken_links(new["graph"], set(page_templates), set(new["static"]))
+
+def build_shard(content_dir, template_path, shard_dir, index, count, jobs = 1, cache = None,
+        writers = 0, search = False, minify = False, block_cache_bytes = 0):
+    # Renders the pages that hash to shard index of count into shard_dir,
+    # which merge_shards later combines with the other shards.
+    if os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.makedirs(shard_dir)
+    pages = discover_pages(content_dir, shard_dir)
+    fingerprint = build_fingerprint([os.path.relpath(from_path, content_dir)
+        for from_path, _ in pages], template_dependencies(content_dir, template_path))
+    selected = select_shard(pages, content_dir, index, count)
+    search_index = SearchIndex() if search else None
+    generate_pages(selected, template_path, jobs, content_dir, None, cache, writers,
+        search_index, None, minify, None, block_cache_bytes)
+    return write_shard_manifest(shard_dir, index, count, fingerprint,
+        [os.path.relpath(from_path, content_dir) for from_path, _ in selected], len(pages),
+        None if search_index is None else search_index.documents)
+
+def watched_paths(content_dir, template_path, static_dir):
+    try:
+        dependencies = template_dependencies(content_dir, template_path)
+    except (OSError, ValueError):
+        dependencies = [template_path]
+    return [content_dir, static_dir] + dependencies
+
+def write_site_feeds(page_index, page_index_path, site_url, site_title, public_dir, content_dir,
+        template_path):
+    if site_title is None:
+        home = page_index.pages.get("index.md")
+        site_title = home["title"] if home is not None else site_url
+    write_feeds(page_index, public_dir, site_url, site_title, content_dir, template_path)
+    page_index.save(page_index_path)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Build the static site")
+    parser.add_argument("--content", default = "./content",
+        help = "directory holding the markdown pages")
+    parser.add_argument("--template", default = "./template.html",
+        help = "template used for pages without a directory template")
+    parser.add_argument("--static", default = "./static",
+        help = "directory holding the static files")
+    parser.add_argument("--public", default = "./public",
+        help = "output directory")
+    parser.add_argument("--incremental", action = "store_true",
+        help = "only rebuild pages and static files whose inputs changed")
+    parser.add_argument("--check-links", action = "store_true",
+        help = "exit with an error when --incremental finds broken internal links")
+    parser.add_argument("--link", choices = LINK_METHODS, default = "copy",
+        help = "how --incremental and --serve place static files into the output directory")
+    parser.add_argument("-j", "--jobs", type = int, default = 1,
+        help = "number of worker processes used to render pages (0 uses every core)")
+    parser.add_argument("--serve", action = "store_true",
+        help = "serve the output directory and rebuild changed pages while watching for edits")
+    parser.add_argument("--port", type = int, default = 8888,
+        help = "port used by --serve and --render-worker")
+    parser.add_argument("--no-reload", action = "store_true",
+        help = "do not inject the browser auto-reload script when serving")
+    parser.add_argument("--profile", action = "store_true",
+        help = "time each build stage per page and print a summary")
+    parser.add_argument("--profile-json",
+        help = "write the per-stage timing report as JSON to this path")
+    parser.add_argument("--state-dir", default = ".",
+        help = "directory holding the build manifest and the search and page indexes")
+    parser.add_argument("--cache-dir", default = "./.build_cache",
+        help = "directory caching rendered page bodies by markdown hash")
+    parser.add_argument("--cache-size", type = int, default = 256,
+        help = "maximum size of the render cache in MB")
+    parser.add_argument("--no-cache", action = "store_true",
+        help = "always parse markdown instead of using the render cache")
+    parser.add_argument("--block-cache-size", type = int, default = 32,
+        help = "maximum size in MB of the in-memory cache of rendered blocks shared by the "
+            "pages a process renders, also used by --batch and --render-worker (0 disables it)")
+    parser.add_argument("--search", action = "store_true",
+        help = "write a sharded client-side search index to search/ in the output directory")
+    parser.add_argument("--images", action = "store_true",
+        help = "publish resized, content-hashed images and point pages at them")
+    parser.add_argument("--image-cache-dir", default = "./.image_cache",
+        help = "directory caching processed images by content hash, kept apart from "
+            "--cache-dir so render cache eviction never touches it")
+    parser.add_argument("--image-widths", default = ",".join(str(width) for width in DEFAULT_WIDTHS),
+        help = "comma separated widths of the resized image variants")
+    parser.add_argument("--image-format", choices = sorted(OUTPUT_FORMATS),
+        help = "convert every image to this format instead of keeping its own")
+    parser.add_argument("--image-quality", type = int, default = 80,
+        help = "JPEG and WebP quality of the published images")
+    parser.add_argument("--minify", action = "store_true",
+        help = "minify generated pages and static CSS")
+    parser.add_argument("--precompress", action = "store_true",
+        help = "write .gz (and .br when brotli is installed) next to text files in the output directory")
+    parser.add_argument("--shard", type = parse_shard,
+        help = "build only shard i/N of the pages into --shard-dir, e.g. --shard 2/4")
+    parser.add_argument("--shard-dir", default = "./.shards",
+        help = "directory holding one output directory per shard")
+    parser.add_argument("--merge-shards", nargs = "+", metavar = "SHARD_DIR",
+        help = "validate the given shard outputs and combine them into the output directory")
+    parser.add_argument("--scan", action = "store_true",
+        help = "print the front matter and title of every page as JSON lines and exit")
+    parser.add_argument("--feeds", action = "store_true",
+        help = "write sitemap.xml, rss.xml, atom.xml and listings for sections without an index.md")
+    parser.add_argument("--site-url", default = "http://localhost:8888",
+        help = "absolute URL the site is served from, used by --feeds")
+    parser.add_argument("--site-title",
+        help = "feed title used by --feeds, defaults to the title of the home page")
+    parser.add_argument("--batch", choices = BATCH_FORMATS,
+        help = "convert markdown documents read from stdin, NUL terminated or as JSON lines, "
+            "to HTML on stdout and exit")
+    parser.add_argument("--render-worker", action = "store_true",
+        help = "serve POST /render, /render/batch and GET /stats on localhost --port, "
+            "rendering markdown to HTML in one long-lived process")
+    parser.add_argument("--render-cache-size", type = int, default = 64,
+        help = "maximum size in MB of the --render-worker in-memory cache")
+    parser.add_argument("--writers", type = int, default = 4,
+        help = "background threads writing pages per worker (0 writes synchronously)")
+    args = parser.parse_args()
+    manifest_path = os.path.join(args.state_dir, ".build_manifest.json")
+    search_documents_path = os.path.join(args.state_dir, ".search_documents.json")
+    page_index_path = os.path.join(args.state_dir, ".page_index.json")
+    block_cache_bytes = args.block_cache_size * 1024 * 1024
+    if args.batch:
+        block_cache = BlockCache(block_cache_bytes) if block_cache_bytes > 0 else None
+        if run_batch(args.batch, sys.stdin.buffer, sys.stdout.buffer, None, block_cache) != 0:
+            sys.exit(1)
+        return
+    if args.render_worker:
+        serve_renderer(port = args.port, cache_bytes = args.render_cache_size * 1024 * 1024,
+            block_cache_bytes = block_cache_bytes)
+        return
+    if args.scan:
+        for page in scan_pages(args.content):
+            print(json.dumps(page, sort_keys = True))
+        return
+    cache = None
+    if not args.no_cache:
+        cache = RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    image_pipeline = None
+    if args.images:
+        widths = [int(width) for width in args.image_widths.split(",") if width.strip() != ""]
+        image_pipeline = ImagePipeline(args.image_cache_dir, widths,
+            args.image_format, args.image_quality)
+    search_index = None
+    if args.search:
+        search_index = SearchIndex()
+        if args.incremental or args.serve:
+            search_index.load(search_documents_path)
+    page_index = None
+    if args.feeds:
+        page_index = PageIndex()
+        if args.incremental or args.serve:
+            page_index.load(page_index_path)
+    if args.shard is not None:
+        index, count = args.shard
+        build_shard(args.content, args.template,
+            os.path.join(args.shard_dir, f"{index}-of-{count}"), index, count, args.jobs, cache,
+            args.writers, args.search, args.minify, block_cache_bytes)
+        return
+    if args.merge_shards:
+        manifests = check_shards(args.merge_shards)
+        if args.minify:
+            rm_public(args.public)
+            sync_static(args.static, args.public, minify = True)
+        else:
+            cp_static_to_public(args.static, args.public)
+        documents = merge_shards(args.merge_shards, manifests, args.public, args.link)
+        if search_index is not None and documents is not None:
+            search_index.documents = documents
+            search_index.save(search_documents_path)
+            search_index.write(os.path.join(args.public, "search"))
+        if page_index is not None:
+            for page in scan_pages(args.content):
+                page_index.add(page["path"], page)
+            write_site_feeds(page_index, page_index_path, args.site_url, args.site_title,
+                args.public, args.content, args.template)
+        if args.precompress:
+            precompress_tree(args.public)
+        return
+    if args.serve:
+        def build():
+            incremental_build(args.content, args.template, args.static, args.public,
+                manifest_path, args.jobs, None, args.link, cache, args.writers,
+                search_index, image_pipeline, args.minify, page_index, block_cache_bytes)
+            if search_index is not None:
+                search_index.save(search_documents_path)
+                search_index.write(os.path.join(args.public, "search"))
+            if page_index is not None:
+                write_site_feeds(page_index, page_index_path, args.site_url, args.site_title,
+                    args.public, args.content, args.template)
+            if args.precompress:
+                precompress_tree(args.public)
+        serve(args.public, build,
+            lambda: watched_paths(args.content, args.template, args.static),
+            args.port, not args.no_reload)
+        return
+    profile = None
+    if args.profile or args.profile_json:
+        profile = BuildProfile()
+    if args.incremental:
+        broken = incremental_build(args.content, args.template, args.static, args.public,
+            manifest_path, args.jobs, profile, args.link, cache,
+            args.writers, search_index, image_pipeline, args.minify, page_index,
+            block_cache_bytes)
+        for page, url in broken:
+            print(f"Broken link in {page}: {url}")
+        if args.check_links and len(broken) != 0:
+            sys.exit(1)
+    else:
+        if args.minify:
+            rm_public(args.public)
+            sync_static(args.static, args.public, minify = True)
+        else:
+            cp_static_to_public(args.static, args.public)
+        images = None
+        if image_pipeline is not None:
+            images = publish_images(args.static, args.public, stat_tree(args.static),
+                image_pipeline)
+        pages = discover_pages(args.content, args.public)
+        generate_pages(pages, args.template, args.jobs, args.content, profile, cache,
+            args.writers, search_index, images, args.minify, page_index, block_cache_bytes)
+    if search_index is not None:
+        search_index.save(search_documents_path)
+        search_index.write(os.path.join(args.public, "search"))
+    if page_index is not None:
+        write_site_feeds(page_index, page_index_path, args.site_url, args.site_title,
+            args.public, args.content, args.template)
+    if args.precompress:
+        precompress_tree(args.public)
+    if profile is not None:
+        profile.finish()
+        print(profile.format_report())
+        if args.profile_json:
+            with open(args.profile_json, mode = "w") as profile_file:
+                profile_file.write(profile.to_json())
 
+if __name__ == "__main__":
+    main()
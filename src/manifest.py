@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 6
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def list_files(root):
+    ret = []
+    if not os.path.exists(root):
+        return ret
+    for dir_path, dir_names, file_names in os.walk(root):
+        for file_name in file_names:
+            full_path = os.path.join(dir_path, file_name)
+            ret.append(os.path.relpath(full_path, root))
+    return sorted(ret)
+
+def hash_tree(root, old_entries = None):
+    # Entries are [size, mtime_ns, sha256]. Files whose size and mtime are
+    # unchanged reuse the previous hash instead of being re-read.
+    if old_entries is None:
+        old_entries = {}
+    entries = {}
+    for path in list_files(root):
+        full_path = os.path.join(root, path)
+        stat = os.stat(full_path)
+        old = old_entries.get(path)
+        if old is not None and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+            entries[path] = old
+        else:
+            entries[path] = [stat.st_size, stat.st_mtime_ns, hash_file(full_path)]
+    return entries
+
+def hash_files(paths):
+    return {path: hash_file(path) for path in paths}
+
+def empty_manifest():
+    # options holds the build flags that change page output, such as
+    # minify. Pages are all rebuilt when they differ from the last build.
+    return {"version": MANIFEST_VERSION, "options": {}, "templates": {}, "content": {},
+        "static": {}, "images": {}, "graph": {}}
+
+def build_manifest(content_dir, old = None):
+    # Static entries are filled in by sync_static, which only needs size
+    # and mtime, so multi-GB asset trees are never hashed. Template hashes
+    # and the dependency graph are filled in by the build.
+    if old is None:
+        old = empty_manifest()
+    manifest = empty_manifest()
+    manifest["content"] = hash_tree(content_dir, old["content"])
+    return manifest
+
+def diff_entries(old_entries, new_entries):
+    changed = set()
+    for path, entry in new_entries.items():
+        old = old_entries.get(path)
+        if old is None or old[2] != entry[2]:
+            changed.add(path)
+    removed = sorted(path for path in old_entries if path not in new_entries)
+    return changed, removed
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as manifest_file:
+        try:
+            manifest = json.load(manifest_file)
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def save_manifest(manifest, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode = "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent = 1, sort_keys = True)
+    os.replace(tmp_path, path)
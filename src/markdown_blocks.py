@@ -1,5 +1,12 @@
+import io
+import mmap
 import re
 
+from frontmatter import (header_title,
+    is_delimiter,
+    read_header,
+    skip_front_matter,
+    text_lines)
 from textnode import TextNode, TextType
 from htmlnode import ParentNode, LeafNode
 
@@ -48,6 +55,11 @@ def extract_markdown_images(text):
 def extract_markdown_links(text):
     return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
 
+def block_references(block, links, images):
+    # Appends the URLs of the links and images in block.
+    links.extend(url for _, url in extract_markdown_links(block))
+    images.extend(url for _, url in extract_markdown_images(block))
+
 def split_nodes_link(old_nodes):
     ret = []
     for node in old_nodes:
@@ -94,7 +106,13 @@ def split_nodes_image(old_nodes):
             ret.append(TextNode(sections[1], TextType.NORMAL))
     return ret
 
-def text_to_textnodes(text):
+INLINE_TOKEN_RE = re.compile(r"(!?)\[([^\[\]]*)\]\(([^\(\)]*)\)|\*\*|\*|`")
+# Delimiters in the order the split_nodes_delimiter passes used to run. A
+# delimiter inside a span opened by an earlier one is literal text, while a
+# delimiter of an earlier pass inside a later span leaves that span unclosed.
+INLINE_DELIMITERS = {"**": (0, TextType.BOLD), "*": (1, TextType.ITALIC), "`": (2, TextType.CODE)}
+
+def text_to_textnodes_chained(text):
     textnode = TextNode(text, TextType.NORMAL)
     ret = [textnode]
     ret = split_nodes_image(ret)
@@ -104,17 +122,285 @@ def text_to_textnodes(text):
     ret = split_nodes_delimiter(ret, r"`", TextType.CODE)
     return ret
 
+def text_to_textnodes(text):
+    ret = []
+    open_level = None
+    open_type = TextType.NORMAL
+    piece_start = 0
+    for match in INLINE_TOKEN_RE.finditer(text):
+        delimiter = INLINE_DELIMITERS.get(match.group(0))
+        if delimiter is None:
+            if open_level is not None:
+                raise ValueError("Invalid markdown, formatted section not closed")
+            if match.start() != piece_start:
+                ret.append(TextNode(text[piece_start:match.start()], TextType.NORMAL))
+            if match.group(1) == "!":
+                ret.append(TextNode(match.group(2), TextType.IMAGES, match.group(3)))
+            else:
+                ret.append(TextNode(match.group(2), TextType.LINKS, match.group(3)))
+            piece_start = match.end()
+            continue
+        level, text_type = delimiter
+        if open_level is not None and open_level < level:
+            continue
+        if open_level is not None and open_level > level:
+            raise ValueError("Invalid markdown, formatted section not closed")
+        if match.start() != piece_start:
+            ret.append(TextNode(text[piece_start:match.start()], open_type))
+        if open_level is None:
+            open_level = level
+            open_type = text_type
+        else:
+            open_level = None
+            open_type = TextType.NORMAL
+        piece_start = match.end()
+    if open_level is not None:
+        raise ValueError("Invalid markdown, formatted section not closed")
+    if piece_start != len(text):
+        ret.append(TextNode(text[piece_start:], TextType.NORMAL))
+    return ret
+
+def normalize_newlines(text):
+    # Strings from an API or a form may use \r\n or \r, files read in text
+    # mode and map_markdown buffers never do.
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
 def markdown_to_blocks(markdown):
-    line_split = markdown.split("\n\n")
-    final_lines = []
-    for line in line_split:
-        if line == "":
+    # markdown may also be a bytes-like buffer such as a map_markdown mmap.
+    if not isinstance(markdown, str):
+        return list(iter_mapped_blocks(markdown))
+    return list(iter_markdown_blocks(normalize_newlines(markdown).split("\n")))
+
+def iter_markdown_blocks(lines):
+    # Blank lines end a block except inside a ``` fence, so code blocks may
+    # contain empty lines. Accepts any iterable of lines, such as a file.
+    # Whitespace-only blocks are dropped rather than becoming empty <p>s.
+    # Front matter at the top is metadata, not content, and is skipped.
+    block_lines = []
+    in_fence = False
+    for line in skip_front_matter(lines):
+        if line.endswith("\n"):
+            line = line[:-1]
+        if line == "" and not in_fence:
+            block = "\n".join(block_lines).strip()
+            if block != "":
+                yield block
+            block_lines = []
             continue
-        line = line.strip()
-        final_lines.append(line)
-    return final_lines
+        if line.count("```") % 2 == 1:
+            in_fence = not in_fence
+        block_lines.append(line)
+    block = "\n".join(block_lines).strip()
+    if block != "":
+        yield block
+
+def iter_block_ranges(buffer):
+    # Splits a UTF-8 bytes-like buffer the way iter_markdown_blocks splits
+    # lines, but yields (start, end) offsets so nothing is copied until
+    # block_text decodes a block. Ranges holding only whitespace are not
+    # filtered out here, block_text returns "" for them.
+    block_start = None
+    block_end = 0
+    in_fence = False
+    for line_start, line_end in iter_line_ranges(buffer, front_matter_end(buffer)):
+        if line_end == line_start and not in_fence:
+            if block_start is not None:
+                yield block_start, block_end
+                block_start = None
+        else:
+            if count_fences(buffer, line_start, line_end) % 2 == 1:
+                in_fence = not in_fence
+            if block_start is None:
+                block_start = line_start
+            block_end = line_end
+    if block_start is not None:
+        yield block_start, block_end
+
+def count_fences(buffer, start, end):
+    # mmap has find() but no count().
+    ret = 0
+    position = buffer.find(b"```", start, end)
+    while position != -1:
+        ret += 1
+        position = buffer.find(b"```", position + 3, end)
+    return ret
+
+def block_text(buffer, start, end):
+    with memoryview(buffer) as view:
+        return str(view[start:end], "utf-8").strip()
+
+def iter_mapped_blocks(buffer):
+    for start, end in iter_block_ranges(buffer):
+        block = block_text(buffer, start, end)
+        if block != "":
+            yield block
+
+def iter_line_ranges(buffer, position = 0):
+    size = len(buffer)
+    while True:
+        line_end = buffer.find(b"\n", position)
+        if line_end == -1:
+            yield position, size
+            return
+        yield position, line_end
+        position = line_end + 1
+
+def iter_buffer_lines(buffer):
+    # Slices rather than a memoryview: a half consumed generator holding a
+    # view would keep an mmap from being closed.
+    for start, end in iter_line_ranges(buffer):
+        yield buffer[start:end].decode("utf-8")
+
+def front_matter_end(buffer):
+    # Offset where the body of a mapped source starts.
+    opened = False
+    for start, end in iter_line_ranges(buffer):
+        line = buffer[start:end].decode("utf-8")
+        if not opened:
+            if not is_delimiter(line):
+                return 0
+            opened = True
+        elif is_delimiter(line):
+            return min(end + 1, len(buffer))
+    raise ValueError("Invalid markdown, front matter not closed")
+
+def map_markdown(path):
+    # Maps path read-only. Returns None for empty files and files with \r
+    # line endings, which only text mode reads translate.
+    with open(path, "rb") as markdown_file:
+        try:
+            buffer = mmap.mmap(markdown_file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            return None
+    if buffer.find(b"\r") != -1:
+        buffer.close()
+        return None
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        buffer.madvise(mmap.MADV_SEQUENTIAL)
+    return buffer
+
+def collect_text(node, body, headings, in_heading = False):
+    # Appends the text of an HTMLNode tree to body, or to headings for text
+    # inside h1 to h6. Images count with their alt text.
+    in_heading = in_heading or node.tag in HEADING_TAGS
+    if isinstance(node, ParentNode):
+        for child in node.children:
+            collect_text(child, body, headings, in_heading)
+        return
+    if node.tag == "img":
+        body.append(node.props.get("alt", ""))
+        return
+    if node.value:
+        if in_heading:
+            headings.append(node.value)
+        else:
+            body.append(node.value)
+
+def render_block(block):
+    # The (html, headings, body) a BlockCache holds for a block.
+    html_node = block_to_html_node(block, block_to_block_type(block))
+    headings = []
+    body = []
+    collect_text(html_node, body, headings)
+    return html_node.to_html(), " ".join(headings), " ".join(body)
+
+def write_blocks_html(blocks, out, block_cache = None, text = None):
+    # With a block_cache (see cache.BlockCache), blocks rendered before are
+    # written from it instead of being parsed again. text, when given, is a
+    # (headings, body) pair of lists that gets the text of every block.
+    out.write("<div>")
+    for block in blocks:
+        if block_cache is None:
+            html_node = block_to_html_node(block, block_to_block_type(block))
+            html_node.write_html(out)
+            if text is not None:
+                collect_text(html_node, text[1], text[0])
+            continue
+        rendered = block_cache.get(block)
+        if rendered is None:
+            rendered = render_block(block)
+            block_cache.put(block, rendered)
+        out.write(rendered[0])
+        if text is not None:
+            text[0].append(rendered[1])
+            text[1].append(rendered[2])
+    out.write("</div>")
+
+def write_markdown_html(lines, out, block_cache = None, text = None):
+    write_blocks_html(iter_markdown_blocks(lines), out, block_cache, text)
+
+def markdown_to_html(markdown, block_cache = None, text = None):
+    # Same as markdown_to_html_node(markdown).to_html() without building
+    # the page's tree. markdown is a string or a map_markdown buffer.
+    out = io.StringIO()
+    if isinstance(markdown, str):
+        write_markdown_html(normalize_newlines(markdown).split("\n"), out, block_cache, text)
+    else:
+        write_blocks_html(iter_mapped_blocks(markdown), out, block_cache, text)
+    return out.getvalue()
+
+class MarkdownFile():
+
+    def __init__(self, path, block_cache = None):
+        self.path = path
+        self.block_cache = block_cache
+        # URLs found while writing, so the page is not read again for them.
+        self.links = []
+        self.images = []
+
+    def write_html(self, out):
+        buffer = map_markdown(self.path)
+        if buffer is None:
+            with open(self.path) as markdown_file:
+                write_blocks_html(self.scan(iter_markdown_blocks(markdown_file)), out,
+                    self.block_cache)
+            return
+        with buffer:
+            write_blocks_html(self.scan(iter_mapped_blocks(buffer)), out, self.block_cache)
+
+    def scan(self, blocks):
+        for block in blocks:
+            block_references(block, self.links, self.images)
+            yield block
+
+HEADING_RE = re.compile(r"#{1,6} ")
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+HEADING_LEAD_RE = re.compile(r"#{1,6}")
+ORDERED_ITEM_RE = re.compile(r"[1-9]{1,2}. ")
 
 def block_to_block_type(block):
+    if HEADING_RE.match(block):
+        return "HEADING"
+    fences = block.count("```")
+    if fences != 0:
+        if fences == 1:
+            raise ValueError("Invalid markdown, code block not closed")
+        return "CODE"
+    # One pass over the lines, counting each prefix. Counts are compared with
+    # splitlines() like the regex version, which also counts lines split on
+    # separators other than "\n".
+    quotes = stars = dashes = numbers = 0
+    for line in block.split("\n"):
+        if line.startswith(">"):
+            quotes += 1
+        elif line.startswith("* "):
+            stars += 1
+        elif line.startswith("- "):
+            dashes += 1
+        elif ORDERED_ITEM_RE.match(line):
+            numbers += 1
+    line_count = len(block.splitlines())
+    if quotes == line_count:
+        return "QUOTE"
+    if stars == line_count or dashes == line_count:
+        return "UNORDERED LIST"
+    if numbers == line_count:
+        return "ORDERED LIST"
+    return "PARAGRAPH"
+
+def block_to_block_type_regex(block):
     if len(re.findall(r"^#{1,6} ", block)) != 0:
         return "HEADING"
     if len(re.findall(r"```", block)) != 0:
@@ -136,28 +422,19 @@ def markdown_to_html_node(markdown):
     html_nodes = []
     for block in blocks:
         block_type = block_to_block_type(block)
-        match block_type:
-            case "HEADING":
-                html_nodes.append(heading_block_to_html(block))
-            case "CODE":
-                html_nodes.append(code_block_to_html(block))
-            case "QUOTE":
-                html_nodes.append(quote_block_to_html(block))
-            case "UNORDERED LIST":
-                html_nodes.append(UL_block_to_html(block))
-            case "ORDERED LIST":
-                html_nodes.append(OL_block_to_html(block))
-            case "PARAGRAPH":
-                html_nodes.append(paragraph_block_to_html(block))
-            case _:
-                raise ValueError("Invalid markdown type")
+        html_nodes.append(block_to_html_node(block, block_type))
     return_node = ParentNode("div", html_nodes)
     return return_node 
+
+def block_to_html_node(block, block_type):
+    builder = BLOCK_BUILDERS.get(block_type)
+    if builder is None:
+        raise ValueError("Invalid markdown type")
+    return builder(block)
                 
 def heading_block_to_html(block):
     html_nodes = []
-    heading_lead = re.findall(r"^#{1,6}", block)
-    heading_level = len(heading_lead[0])
+    heading_level = len(HEADING_LEAD_RE.match(block).group(0))
     text_nodes = text_to_textnodes(block[heading_level + 1:])
     for text_node in text_nodes:
         converted_node = text_node_to_html_node(text_node)
@@ -225,7 +502,15 @@ def paragraph_block_to_html(block):
     return return_node
 
 def extract_title(markdown):
-    header = re.findall(r"^#{1} .+", markdown)
-    if len(header) == 0:
-        raise ValueError("Invalid markdown, no title provided")
-    return header[0].lstrip("# ")
+    # The front matter title, or a heading on the first line of the body, so
+    # there is no need to scan the rest of the document.
+    return header_title(*read_header(text_lines(markdown)))
+
+BLOCK_BUILDERS = {
+    "HEADING": heading_block_to_html,
+    "CODE": code_block_to_html,
+    "QUOTE": quote_block_to_html,
+    "UNORDERED LIST": UL_block_to_html,
+    "ORDERED LIST": OL_block_to_html,
+    "PARAGRAPH": paragraph_block_to_html,
+}
@@ -0,0 +1,151 @@
+import io
+import json
+import time
+
+from htmlnode import ParentNode
+from markdown_blocks import (markdown_to_blocks,
+    block_to_block_type,
+    block_to_html_node,
+    collect_text)
+
+STAGES = ("read", "template", "cache", "blocks", "classify", "inline", "serialize", "minify", "write",
+    "images", "search", "stream")
+
+class StageClock():
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.stage = None
+        self.start = None
+
+    def __call__(self, stage):
+        self.stage = stage
+        return self
+
+    def __enter__(self):
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            elapsed = time.perf_counter() - self.start
+            self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed
+        return False
+
+def profiled_markdown_to_html_node(markdown, timings):
+    # Mirrors markdown_to_html_node with the block split, classification and
+    # per-block conversion timed separately.
+    clock = StageClock(timings)
+    with clock("blocks"):
+        blocks = markdown_to_blocks(markdown)
+    html_nodes = []
+    for block in blocks:
+        with clock("classify"):
+            block_type = block_to_block_type(block)
+        with clock("inline"):
+            html_nodes.append(block_to_html_node(block, block_type))
+    return ParentNode("div", html_nodes)
+
+def profiled_markdown_to_html(markdown, timings, block_cache, text = None):
+    # Mirrors markdown_to_html with a block cache. Lookups count as "cache",
+    # rendering a missed block as "classify", "inline", "serialize" and
+    # "search".
+    clock = StageClock(timings)
+    with clock("blocks"):
+        blocks = markdown_to_blocks(markdown)
+    out = io.StringIO()
+    out.write("<div>")
+    for block in blocks:
+        with clock("cache"):
+            rendered = block_cache.get(block)
+        if rendered is None:
+            with clock("classify"):
+                block_type = block_to_block_type(block)
+            with clock("inline"):
+                html_node = block_to_html_node(block, block_type)
+            with clock("serialize"):
+                html = html_node.to_html()
+            with clock("search"):
+                headings = []
+                body = []
+                collect_text(html_node, body, headings)
+            rendered = (html, " ".join(headings), " ".join(body))
+            block_cache.put(block, rendered)
+        out.write(rendered[0])
+        if text is not None:
+            text[0].append(rendered[1])
+            text[1].append(rendered[2])
+    out.write("</div>")
+    return out.getvalue()
+
+class BuildProfile():
+
+    def __init__(self):
+        self.pages = {}
+        self.block_hits = 0
+        self.block_misses = 0
+        self.start = time.perf_counter()
+        self.end = None
+
+    def record(self, page, timings):
+        self.pages[page] = timings
+
+    def record_blocks(self, hits, misses):
+        self.block_hits += hits
+        self.block_misses += misses
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def wall_time(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def totals(self):
+        ret = {stage: 0.0 for stage in STAGES}
+        for timings in self.pages.values():
+            for stage, seconds in timings.items():
+                ret[stage] = ret.get(stage, 0.0) + seconds
+        return ret
+
+    def slowest(self, count = 10):
+        page_totals = [(sum(timings.values()), page) for page, timings in self.pages.items()]
+        page_totals.sort(reverse = True)
+        return [(page, seconds) for seconds, page in page_totals[:count]]
+
+    def summary(self, count = 10):
+        wall_time = self.wall_time()
+        return {
+            "pages": len(self.pages),
+            "wall_seconds": wall_time,
+            "pages_per_second": len(self.pages) / wall_time if wall_time > 0 else None,
+            "stage_totals": self.totals(),
+            "slowest_pages": [{"page": page, "seconds": seconds}
+                for page, seconds in self.slowest(count)],
+            "block_cache": {"hits": self.block_hits, "misses": self.block_misses},
+        }
+
+    def to_json(self, count = 10):
+        ret = self.summary(count)
+        ret["page_timings"] = self.pages
+        return json.dumps(ret, indent = 1, sort_keys = True)
+
+    def format_report(self, count = 10):
+        summary = self.summary(count)
+        totals = summary["stage_totals"]
+        total = sum(totals.values())
+        lines = [f"Built {summary['pages']} pages in {summary['wall_seconds']:.3f}s "
+            f"({summary['pages_per_second'] or 0:.1f} pages/s)",
+            f"{'stage':<12}{'seconds':>10}{'share':>8}"]
+        for stage, seconds in totals.items():
+            share = seconds / total * 100 if total > 0 else 0
+            lines.append(f"{stage:<12}{seconds:>10.4f}{share:>7.1f}%")
+        lookups = self.block_hits + self.block_misses
+        if lookups != 0:
+            lines.append(f"Block cache: {self.block_hits} of {lookups} blocks reused "
+                f"({self.block_hits / lookups * 100:.1f}%)")
+        lines.append("Slowest pages:")
+        for page in summary["slowest_pages"]:
+            lines.append(f"{page['seconds']:>10.4f}  {page['page']}")
+        return "\n".join(lines)
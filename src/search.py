@@ -0,0 +1,88 @@
+import json
+import os
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+HEADING_WEIGHT = 5
+STOP_WORDS = frozenset(("a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "with"))
+
+def tokenize(text):
+    ret = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if len(token) > 1 and token not in STOP_WORDS:
+            ret.append(token)
+    return ret
+
+def search_document(url, title, text):
+    # text is the (headings, body) pair of lists render_markdown fills in,
+    # or None for a page without indexed text.
+    headings, body = text if text is not None else ([], [])
+    terms = {}
+    for token in tokenize(" ".join(body)):
+        terms[token] = terms.get(token, 0) + 1
+    for token in tokenize(" ".join(headings)):
+        terms[token] = terms.get(token, 0) + HEADING_WEIGHT
+    return {"url": url, "title": title, "terms": terms}
+
+def shard_key(term):
+    first = term[0]
+    if first.isascii() and first.isalnum():
+        return first
+    return "_"
+
+class SearchIndex():
+
+    def __init__(self):
+        self.documents = {}
+
+    def add(self, page, document):
+        self.documents[page] = document
+
+    def remove(self, page):
+        self.documents.pop(page, None)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path) as documents_file:
+            try:
+                self.documents = json.load(documents_file)
+            except json.JSONDecodeError:
+                self.documents = {}
+
+    def save(self, path):
+        with open(path, mode = "w") as documents_file:
+            json.dump(self.documents, documents_file, separators = (",", ":"), sort_keys = True)
+
+    def build(self):
+        docs = []
+        shards = {}
+        for page in sorted(self.documents):
+            document = self.documents[page]
+            doc_id = len(docs)
+            docs.append([document["url"], document["title"]])
+            for term, score in sorted(document["terms"].items()):
+                postings = shards.setdefault(shard_key(term), {}).setdefault(term, [])
+                postings.append([doc_id, score])
+        for shard in shards.values():
+            for postings in shard.values():
+                postings.sort(key = lambda posting: (-posting[1], posting[0]))
+        return docs, shards
+
+    def write(self, out_dir):
+        # docs.json maps document ids to [url, title]; index-<key>.json holds
+        # the postings for every term starting with <key>, best match first.
+        docs, shards = self.build()
+        os.makedirs(out_dir, exist_ok = True)
+        for file_name in os.listdir(out_dir):
+            if file_name.startswith("index-") and file_name.endswith(".json"):
+                os.remove(os.path.join(out_dir, file_name))
+        with open(os.path.join(out_dir, "docs.json"), mode = "w") as docs_file:
+            json.dump(docs, docs_file, separators = (",", ":"))
+        for key, shard in shards.items():
+            with open(os.path.join(out_dir, f"index-{key}.json"), mode = "w") as shard_file:
+                json.dump(shard, shard_file, separators = (",", ":"), sort_keys = True)
+        with open(os.path.join(out_dir, "meta.json"), mode = "w") as meta_file:
+            json.dump({"documents": len(docs), "shards": sorted(shards)}, meta_file,
+                separators = (",", ":"))
@@ -0,0 +1,130 @@
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from manifest import list_files
+
+RELOAD_PATH = "/__build_id"
+RELOAD_SCRIPT = b"""<script>
+(function () {
+    var current = null;
+    setInterval(function () {
+        fetch("/__build_id", {cache: "no-store"}).then(function (response) {
+            return response.text();
+        }).then(function (buildId) {
+            if (current !== null && buildId !== current) {
+                location.reload();
+            }
+            current = buildId;
+        }).catch(function () {});
+    }, 1000);
+})();
+</script>
+"""
+
+def snapshot(paths):
+    ret = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            ret[path] = (stat.st_size, stat.st_mtime_ns)
+            continue
+        for child_path in list_files(path):
+            full_path = os.path.join(path, child_path)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            ret[full_path] = (stat.st_size, stat.st_mtime_ns)
+    return ret
+
+def inject_reload_script(html):
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + RELOAD_SCRIPT
+    return html[:index] + RELOAD_SCRIPT + html[index:]
+
+class BuildState():
+
+    def __init__(self):
+        self.build_id = 0
+        self.stop = threading.Event()
+
+def run_build(build, action):
+    # A failed build is printed rather than raised, the watcher builds again
+    # once the sources change. Returns whether the build succeeded.
+    try:
+        build()
+    except Exception as e:
+        print(f"{action} failed: {type(e).__name__}: {e}")
+        return False
+    return True
+
+def watch(build, watched_paths, state, interval = 0.5, previous = None):
+    # watched_paths is called on every poll so newly added partials and
+    # directory templates are picked up without a restart.
+    if previous is None:
+        previous = snapshot(watched_paths())
+    while not state.stop.wait(interval):
+        current = snapshot(watched_paths())
+        if current == previous:
+            continue
+        previous = current
+        if not run_build(build, "Rebuild"):
+            continue
+        state.build_id += 1
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+
+    def __init__(self, *args, state = None, live_reload = True, **kwargs):
+        self.state = state
+        self.live_reload = live_reload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        request_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if request_path == RELOAD_PATH:
+            self.send_bytes(str(self.state.build_id).encode(), "text/plain")
+            return
+        if not self.live_reload:
+            super().do_GET()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not request_path.endswith("/"):
+                super().do_GET()
+                return
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "rb") as html_file:
+            html = html_file.read()
+        self.send_bytes(inject_reload_script(html), "text/html; charset=utf-8")
+
+    def send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(public_dir, build, watched_paths, port = 8888, live_reload = True, interval = 0.5):
+    previous = snapshot(watched_paths())
+    run_build(build, "Build")
+    state = BuildState()
+    watcher = threading.Thread(target = watch,
+        args = (build, watched_paths, state, interval, previous), daemon = True)
+    watcher.start()
+    handler = functools.partial(DevRequestHandler, directory = public_dir,
+        state = state, live_reload = live_reload)
+    with ThreadingHTTPServer(("", port), handler) as httpd:
+        print(f"Serving {public_dir} on http://localhost:{port}/")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            state.stop.set()
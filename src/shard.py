@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+
+from cache import parser_version
+from manifest import (hash_file,
+    list_files)
+from sync import transfer_file
+
+SHARD_MANIFEST_NAME = "shard.json"
+SHARD_MANIFEST_VERSION = 1
+
+def parse_shard(text):
+    # "i/N" with 1 <= i <= N.
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {text}, expected i/N")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {text}, expected i/N with 1 <= i <= N")
+    return index, count
+
+def page_key(page):
+    return page.replace(os.sep, "/")
+
+def shard_of(page, count):
+    # page is relative to the content root. The hash is over the path with
+    # "/" separators, so every machine agrees on the partition.
+    digest = hashlib.sha256(page_key(page).encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+def select_shard(pages, content_root, index, count):
+    return [(from_path, dest_path) for from_path, dest_path in pages
+        if shard_of(os.path.relpath(from_path, content_root), count) == index]
+
+def build_fingerprint(pages, template_paths):
+    # Shards can only be merged when they agree on the page list, the
+    # templates and the parser, otherwise pages could be missing or differ
+    # in layout between shards.
+    digest = hashlib.sha256(parser_version().encode())
+    for page in sorted(page_key(page) for page in pages):
+        digest.update(page.encode() + b"\0")
+    for path in template_paths:
+        digest.update(hash_file(path).encode())
+    return digest.hexdigest()
+
+def write_shard_manifest(shard_dir, index, count, fingerprint, pages, total, search_documents = None):
+    files = {}
+    for path in list_files(shard_dir):
+        if path != SHARD_MANIFEST_NAME:
+            files[page_key(path)] = hash_file(os.path.join(shard_dir, path))
+    manifest = {
+        "version": SHARD_MANIFEST_VERSION,
+        "shard": index,
+        "count": count,
+        "fingerprint": fingerprint,
+        "pages": sorted(page_key(page) for page in pages),
+        "total": total,
+        "files": files,
+        "search": search_documents,
+    }
+    with open(os.path.join(shard_dir, SHARD_MANIFEST_NAME), mode = "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent = 1, sort_keys = True)
+    return manifest
+
+def load_shard_manifest(shard_dir):
+    path = os.path.join(shard_dir, SHARD_MANIFEST_NAME)
+    try:
+        with open(path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"{shard_dir}: no readable {SHARD_MANIFEST_NAME}: {e}")
+    if not isinstance(manifest, dict) or manifest.get("version") != SHARD_MANIFEST_VERSION:
+        raise ValueError(f"{shard_dir}: unsupported {SHARD_MANIFEST_NAME}")
+    return manifest
+
+def validate_shards(shard_dirs, manifests):
+    errors = []
+    count = manifests[0]["count"]
+    fingerprint = manifests[0]["fingerprint"]
+    seen = {}
+    owners = {}
+    built = 0
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        if manifest["count"] != count or manifest["fingerprint"] != fingerprint:
+            errors.append(f"{shard_dir}: built from different inputs than {shard_dirs[0]}")
+            continue
+        if manifest["shard"] in seen:
+            errors.append(f"{shard_dir}: shard {manifest['shard']}/{count} already in "
+                f"{seen[manifest['shard']]}")
+            continue
+        seen[manifest["shard"]] = shard_dir
+        built += len(manifest["pages"])
+        for page in manifest["pages"]:
+            if shard_of(page, count) != manifest["shard"]:
+                errors.append(f"{shard_dir}: {page} belongs to shard {shard_of(page, count)}")
+        for path, digest in manifest["files"].items():
+            if path in owners:
+                errors.append(f"{shard_dir}: {path} also written by {owners[path]}")
+                continue
+            owners[path] = shard_dir
+            full_path = os.path.join(shard_dir, path)
+            if not os.path.isfile(full_path) or hash_file(full_path) != digest:
+                errors.append(f"{shard_dir}: {path} is missing or was modified")
+    missing = [str(index) for index in range(1, count + 1) if index not in seen]
+    if len(missing) != 0:
+        errors.append(f"missing shard(s) {', '.join(missing)} of {count}")
+    elif len(errors) == 0 and built != manifests[0]["total"]:
+        errors.append(f"shards built {built} of {manifests[0]['total']} pages")
+    return errors
+
+def check_shards(shard_dirs):
+    # Returns the shard manifests, or raises if the shards do not add up to
+    # one complete, consistent build.
+    if len(shard_dirs) == 0:
+        raise ValueError("No shards to merge")
+    manifests = [load_shard_manifest(shard_dir) for shard_dir in shard_dirs]
+    errors = validate_shards(shard_dirs, manifests)
+    if len(errors) != 0:
+        raise ValueError(f"{len(errors)} problem(s) merging shards:\n" + "\n".join(errors))
+    return manifests
+
+def merge_shards(shard_dirs, manifests, public_dir, method = "copy"):
+    # Places the outputs of shards checked by check_shards into public_dir.
+    # Returns the combined search documents, or None when the shards were
+    # built without --search.
+    search_documents = None
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        print(f"Merging shard {manifest['shard']}/{manifest['count']} from {shard_dir}")
+        for path in manifest["files"]:
+            public_path = os.path.join(public_dir, path)
+            os.makedirs(os.path.dirname(public_path), exist_ok = True)
+            transfer_file(os.path.join(shard_dir, path), public_path, method)
+        if manifest["search"] is not None:
+            if search_documents is None:
+                search_documents = {}
+            search_documents.update(manifest["search"])
+    return search_documents
@@ -0,0 +1,95 @@
+import os
+import shutil
+
+from compress import (minifier,
+    minify_file)
+from manifest import list_files
+
+LINK_METHODS = ("copy", "hardlink", "reflink")
+FICLONE = 0x40049409
+
+def stat_tree(root):
+    entries = {}
+    for path in list_files(root):
+        stat = os.stat(os.path.join(root, path))
+        entries[path] = [stat.st_size, stat.st_mtime_ns]
+    return entries
+
+def needs_copy(source_path, dest_path, minified = False, was_minified = False):
+    # was_minified is whether the last build minified dest. A minified dest
+    # keeps the source's mtime but not its size.
+    if minified != was_minified:
+        return True
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return True
+    source_stat = os.stat(source_path)
+    if minified:
+        return source_stat.st_mtime_ns != dest_stat.st_mtime_ns
+    return (source_stat.st_size != dest_stat.st_size
+        or source_stat.st_mtime_ns != dest_stat.st_mtime_ns)
+
+def reflink(source_path, dest_path):
+    import fcntl
+    with open(source_path, "rb") as source_file, open(dest_path, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+    shutil.copystat(source_path, dest_path)
+
+def transfer_file(source_path, dest_path, method = "copy"):
+    # Always unlink first: dest may be a hardlink to the source from an
+    # earlier build, and writing through it would modify ./static.
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    if method == "hardlink":
+        try:
+            os.link(source_path, dest_path)
+            return
+        except OSError:
+            pass
+    elif method == "reflink":
+        try:
+            reflink(source_path, dest_path)
+            return
+        except (ImportError, OSError):
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+    elif method != "copy":
+        raise ValueError(f"Invalid link method: {method}")
+    shutil.copy2(source_path, dest_path)
+
+def remove_output(path, root):
+    if os.path.isfile(path):
+        print(f"Removing stale output {path}")
+        os.remove(path)
+    root = os.path.normpath(root)
+    parent = os.path.normpath(os.path.dirname(path))
+    while parent != root and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+def sync_static(static_dir, public_dir, previous = None, method = "copy", minify = False):
+    # Returns [size, mtime_ns, minified] per static file, previous is what
+    # the last build returned.
+    if previous is None:
+        previous = {}
+    entries = stat_tree(static_dir)
+    for path in previous:
+        if path not in entries:
+            remove_output(os.path.join(public_dir, path), public_dir)
+    for path in entries:
+        static_path = os.path.join(static_dir, path)
+        public_path = os.path.join(public_dir, path)
+        minified = minify and minifier(path) is not None
+        was_minified = path in previous and previous[path][2]
+        entries[path].append(minified)
+        if not needs_copy(static_path, public_path, minified, was_minified):
+            continue
+        os.makedirs(os.path.dirname(public_path), exist_ok = True)
+        if minified:
+            print(f"Minifying from {static_path} to {public_path}")
+            minify_file(static_path, public_path)
+            continue
+        print(f"Copying from {static_path} to {public_path}")
+        transfer_file(static_path, public_path, method)
+    return entries
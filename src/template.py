@@ -0,0 +1,115 @@
+import os
+import re
+
+TEMPLATE_TOKEN_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{%\s*include\s+\"([^\"]+)\"\s*%\}")
+DIRECTORY_TEMPLATE_NAME = "_template.html"
+
+_template_cache = {}
+
+class Template():
+
+    def __init__(self, parts, dependencies):
+        # parts holds literal strings and (name, raw) tuples for variables
+        self.parts = parts
+        self.dependencies = dependencies
+
+    def render(self, out, variables):
+        for part in self.parts:
+            if isinstance(part, str):
+                out.write(part)
+                continue
+            name, raw = part
+            if name not in variables:
+                out.write(raw)
+                continue
+            value = variables[name]
+            if hasattr(value, "write_html"):
+                value.write_html(out)
+            else:
+                out.write(str(value))
+
+    def __repr__(self):
+        return f"Template({self.parts}, {self.dependencies})"
+
+def compile_template(text, base_dir, dependencies = None, stack = None):
+    if dependencies is None:
+        dependencies = []
+    if stack is None:
+        stack = []
+    parts = []
+    position = 0
+    for match in TEMPLATE_TOKEN_RE.finditer(text):
+        if match.start() != position:
+            parts.append(text[position:match.start()])
+        position = match.end()
+        if match.group(1) is not None:
+            parts.append((match.group(1), match.group(0)))
+            continue
+        include_path = os.path.normpath(os.path.join(base_dir, match.group(2)))
+        if include_path in stack:
+            raise ValueError(f"Invalid template, recursive include of {include_path}")
+        with open(include_path) as include_file:
+            include_text = include_file.read()
+        if include_path not in dependencies:
+            dependencies.append(include_path)
+        included = compile_template(include_text, os.path.dirname(include_path),
+            dependencies, stack + [include_path])
+        parts.extend(included.parts)
+    if position != len(text):
+        parts.append(text[position:])
+    return Template(merge_literals(parts), dependencies)
+
+def merge_literals(parts):
+    ret = []
+    for part in parts:
+        if isinstance(part, str) and len(ret) != 0 and isinstance(ret[-1], str):
+            ret[-1] += part
+        else:
+            ret.append(part)
+    return ret
+
+def dependency_stamps(paths):
+    try:
+        return tuple(os.stat(path).st_mtime_ns for path in paths)
+    except FileNotFoundError:
+        return None
+
+def load_template(path):
+    path = os.path.normpath(path)
+    cached = _template_cache.get(path)
+    if cached is not None and cached[0] == dependency_stamps(cached[1].dependencies):
+        return cached[1]
+    with open(path) as template_file:
+        text = template_file.read()
+    template = compile_template(text, os.path.dirname(path), [path], [path])
+    _template_cache[path] = (dependency_stamps(template.dependencies), template)
+    return template
+
+def find_template(page_path, content_root, default_path):
+    content_root = os.path.normpath(content_root)
+    directory = os.path.normpath(os.path.dirname(page_path))
+    while True:
+        candidate = os.path.join(directory, DIRECTORY_TEMPLATE_NAME)
+        if os.path.isfile(candidate):
+            return candidate
+        if directory == content_root or directory in ("", os.sep, "."):
+            return default_path
+        directory = os.path.dirname(directory)
+
+def page_url(rel_path):
+    url = "/" + rel_path.replace(os.sep, "/").replace(".md", ".html")
+    if url.endswith("/index.html"):
+        url = url[:-len("index.html")]
+    return url
+
+def breadcrumbs(url):
+    crumbs = ['<a href="/">Home</a>']
+    sections = [section for section in url.split("/") if section != ""]
+    href = "/"
+    for section in sections:
+        if section.endswith(".html"):
+            crumbs.append(section[:-len(".html")])
+            break
+        href += section + "/"
+        crumbs.append(f'<a href="{href}">{section}</a>')
+    return " / ".join(crumbs)
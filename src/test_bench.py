@@ -0,0 +1,39 @@
+import os
+import random
+import tempfile
+import unittest
+
+from bench import (SHAPES,
+        STAGES,
+        generate_markdown,
+        generate_corpus,
+        run_benchmarks,
+        compare_results)
+from markdown_blocks import markdown_to_html_node, extract_title
+
+
+class TestBench(unittest.TestCase):
+    def test_generated_markdown_parses(self):
+        for shape in SHAPES:
+            markdown = generate_markdown(shape, 10, random.Random(1))
+            markdown_to_html_node(markdown).to_html()
+            extract_title(markdown)
+
+    def test_generation_is_deterministic(self):
+        self.assertEqual(generate_markdown("mixed", 5, random.Random(3)),
+            generate_markdown("mixed", 5, random.Random(3)))
+
+    def test_generate_corpus(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = generate_corpus(root, 5, pages_per_dir = 2)
+            self.assertEqual(5, len(paths))
+            self.assertEqual(3, len(os.listdir(root)))
+
+    def test_run_and_compare(self):
+        results = run_benchmarks(pages = 3, blocks = 3, repeat = 1)
+        self.assertEqual(list(STAGES), list(results["stages"]))
+        changes = compare_results(results, results)
+        self.assertEqual({stage: 0 for stage in STAGES}, changes)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache, MemoryCache, RenderCache, parser_version
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(self.tmp.name, max_bytes = 100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("# Title"))
+        self.cache.put("# Title", "<h1>Title</h1>")
+        self.assertEqual("<h1>Title</h1>", self.cache.get("# Title"))
+
+    def test_text_is_stored_with_html(self):
+        self.cache.put("# Title", "<h1>Title</h1>")
+        text = ([], [])
+        self.assertIsNone(self.cache.get("# Title", text))
+        self.assertEqual(([], []), text)
+        self.cache.put("# Title", "<h1>Title</h1>", (["Title"], ["a", "b"]))
+        self.assertEqual("<h1>Title</h1>", self.cache.get("# Title", text))
+        self.assertEqual((["Title"], ["a b"]), text)
+
+    def test_key_depends_on_content_and_parser(self):
+        self.assertNotEqual(self.cache.key("a"), self.cache.key("b"))
+        self.assertEqual(self.cache.key("\u00e9"), self.cache.key("\u00e9".encode()))
+        self.assertEqual(64, len(parser_version()))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put("old", "x" * 60)
+        self.cache.put("new", "y" * 60)
+        os.utime(self.cache.path(self.cache.key("old")), ns = (0, 0))
+        self.assertEqual(1, self.cache.evict())
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual("y" * 60, self.cache.get("new"))
+
+    def test_eviction_ignores_other_files(self):
+        path = os.path.join(self.tmp.name, "images", "ab", "key", "a.png")
+        os.makedirs(os.path.dirname(path))
+        with open(path, mode = "wb") as f:
+            f.write(b"x" * 200)
+        self.assertEqual(0, self.cache.evict())
+        self.assertTrue(os.path.exists(path))
+
+class TestMemoryCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = MemoryCache(max_bytes = 10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        self.assertEqual("aaaa", cache.get("a"))
+        cache.put("c", "cccc")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual("aaaa", cache.get("a"))
+        self.assertEqual("cccc", cache.get("c"))
+        stats = cache.stats()
+        self.assertEqual(2, stats["entries"])
+        self.assertEqual(8, stats["bytes"])
+        self.assertEqual(1, stats["evictions"])
+        self.assertEqual(0.75, stats["hit_rate"])
+
+    def test_oversized_entries_are_not_cached(self):
+        cache = MemoryCache(max_bytes = 3)
+        cache.put("a", "aaaa")
+        self.assertEqual(0, cache.stats()["entries"])
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_blocks_are_their_own_keys(self):
+        cache = BlockCache(max_bytes = 20)
+        self.assertIsNone(cache.get("# A"))
+        cache.put("# A", ("<h1>A</h1>", "A", ""))
+        self.assertEqual(("<h1>A</h1>", "A", ""), cache.get("# A"))
+        self.assertEqual(14, cache.stats()["bytes"])
+        self.assertEqual((1, 1), cache.counts())
+        cache.put("# B", ("<h1>B</h1>", "B", ""))
+        self.assertIsNone(cache.get("# A"))
+        self.assertEqual(1, cache.stats()["evictions"])
+
+if __name__ == "__main__":
+    unittest.main()
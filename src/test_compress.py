@@ -0,0 +1,70 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import (minify_html,
+        minify_css,
+        precompress_file,
+        precompress_tree)
+from fixtures import write_file
+
+
+class TestMinify(unittest.TestCase):
+    def test_html_whitespace(self):
+        html = "<html>\n  <body>\n    <p>Some  <b>bold</b>\n text</p>\n  </body>\n</html>\n"
+        self.assertEqual("<html><body><p>Some <b>bold</b> text</p></body></html>", minify_html(html))
+
+    def test_html_preserves_pre_and_attributes(self):
+        html = '<p>a</p>\n<pre><code>x  =  1\n\n  y</code></pre>\n<img alt="two  spaces">'
+        self.assertEqual('<p>a</p><pre><code>x  =  1\n\n  y</code></pre><img alt="two  spaces">',
+            minify_html(html))
+
+    def test_html_literal_greater_than(self):
+        self.assertEqual("<p>a -> b</p><p>c > d</p>",
+            minify_html("<p>a -> b</p>\n<p>c  >  d</p>"))
+
+    def test_html_comments(self):
+        self.assertEqual("<p>a</p> <!--[if IE]>x<![endif]-->",
+            minify_html("<p>a</p> <!-- note --> <!--[if IE]>x<![endif]-->"))
+
+    def test_css(self):
+        css = '/* theme */\nbody {\n    color: red;\n    font-family: "Segoe  UI", sans-serif;\n}\n' \
+            "a :hover, a > b { margin: 0 auto; }\n@media screen and (max-width: 600px) {}\n"
+        self.assertEqual('body{color:red;font-family:"Segoe  UI",sans-serif;}'
+            "a :hover,a>b{margin:0 auto;}@media screen and (max-width:600px){}", minify_css(css))
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.page = os.path.join(self.tmp.name, "blog", "post.html")
+        write_file(self.page, "<p>hobbit</p>" * 100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_gzip_sibling(self):
+        self.assertGreaterEqual(precompress_tree(self.tmp.name), 1)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual("<p>hobbit</p>" * 100, f.read())
+
+    def test_unchanged_files_are_skipped(self):
+        precompress_tree(self.tmp.name)
+        self.assertEqual(0, precompress_file(self.page))
+        write_file(self.page, "<p>elf</p>" * 100)
+        self.assertGreaterEqual(precompress_file(self.page), 1)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual("<p>elf</p>" * 100, f.read())
+
+    def test_small_and_stale_siblings(self):
+        small = os.path.join(self.tmp.name, "small.css")
+        archive = os.path.join(self.tmp.name, "site.tar.gz")
+        write_file(small, "a{}")
+        write_file(archive, "archive")
+        precompress_tree(self.tmp.name)
+        self.assertFalse(os.path.exists(small + ".gz"))
+        os.remove(self.page)
+        precompress_tree(self.tmp.name)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertTrue(os.path.exists(archive))
@@ -0,0 +1,127 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from cache import BlockCache
+from convert import (convert,
+        convert_file,
+        convert_many,
+        read_nul_documents,
+        run_jsonl_batch,
+        run_nul_batch)
+
+
+class ChunkedStream():
+    # Hands out input in the given pieces, like a pipe written to piecewise.
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read1(self, size):
+        return self.chunks.pop(0) if len(self.chunks) != 0 else b""
+
+
+class DictCache():
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, markdown):
+        return self.entries.get(markdown)
+
+    def put(self, markdown, html):
+        self.entries[markdown] = html
+
+
+class TestConvert(unittest.TestCase):
+    def test_convert(self):
+        self.assertEqual("<div><h1>Title</h1><p>Some <b>bold</b> text</p></div>",
+            convert("---\ntitle: x\n---\n# Title\n\nSome **bold** text"))
+
+    def test_convert_crlf(self):
+        expected = "<div><h1>Title</h1><p>Some <i>text</i></p><ul><li>a</li><li>b</li></ul></div>"
+        self.assertEqual(expected, convert("# Title\r\n\r\nSome *text*\r\n\r\n* a\r\n* b\r\n"))
+        self.assertEqual(expected, convert("# Title\r\rSome *text*\r\r* a\r* b\r"))
+        self.assertEqual(expected, convert("---\r\ntitle: x\r\n---\r\n# Title\r\n\r\n"
+            "Some *text*\r\n\r\n* a\r\n* b", BlockCache()))
+
+    def test_convert_uses_cache(self):
+        cache = DictCache()
+        cache.put("# A", "<div>cached</div>")
+        self.assertEqual("<div>cached</div>", convert("# A", cache))
+        self.assertEqual("<div><h1>B</h1></div>", convert("# B", cache))
+        self.assertEqual("<div><h1>B</h1></div>", cache.get("# B"))
+
+    def test_convert_file(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "a.md")
+            with open(path, mode = "w") as f:
+                f.write("# A")
+            self.assertEqual("<div><h1>A</h1></div>", convert_file(path))
+
+    def test_convert_many_keeps_going(self):
+        results = list(convert_many(["# A", "**open", "B"]))
+        self.assertEqual(("<div><h1>A</h1></div>", None), results[0])
+        self.assertIsNone(results[1][0])
+        self.assertIn("ValueError", results[1][1])
+        self.assertEqual(("<div><p>B</p></div>", None), results[2])
+
+    def test_convert_many_shares_block_cache(self):
+        block_cache = BlockCache()
+        results = list(convert_many(["# A\n\nFooter", "# B\n\nFooter"], block_cache = block_cache))
+        self.assertEqual(("<div><h1>B</h1><p>Footer</p></div>", None), results[1])
+        self.assertEqual((1, 3), block_cache.counts())
+
+    def test_read_nul_documents_across_chunks(self):
+        stream = ChunkedStream([b"# A\0# ", b"B", b"\0\0", b"tail"])
+        self.assertEqual([b"# A", b"# B", b"", b"tail"], list(read_nul_documents(stream)))
+
+    def test_read_nul_documents_is_incremental(self):
+        stream = ChunkedStream([b"# A\0", b"# B"])
+        documents = read_nul_documents(stream)
+        self.assertEqual(b"# A", next(documents))
+        self.assertEqual([b"# B"], stream.chunks)
+
+
+class TestBatch(unittest.TestCase):
+    def test_nul_batch(self):
+        stdout = io.BytesIO()
+        log = io.StringIO()
+        failures = run_nul_batch(io.BytesIO(b"# A\0**open\0\xff\0B\0"), stdout, log = log)
+        self.assertEqual(2, failures)
+        self.assertEqual([b"<div><h1>A</h1></div>", b"", b"", b"<div><p>B</p></div>", b""],
+            stdout.getvalue().split(b"\0"))
+        self.assertIn("Document 2: ValueError", log.getvalue())
+        self.assertIn("Document 3: UnicodeDecodeError", log.getvalue())
+
+    def test_jsonl_batch(self):
+        stdin = io.BytesIO(b'"# A"\n\n{"id": 7, "markdown": "B"}\n{"id": "x", "markdown": "**open"}\n'
+            b'[1]\nnot json\n')
+        stdout = io.BytesIO()
+        self.assertEqual(3, run_jsonl_batch(stdin, stdout))
+        responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual({"html": "<div><h1>A</h1></div>"}, responses[0])
+        self.assertEqual({"id": 7, "html": "<div><p>B</p></div>"}, responses[1])
+        self.assertEqual("x", responses[2]["id"])
+        self.assertEqual(["error"], list(responses[3]))
+        self.assertEqual(["error"], list(responses[4]))
+
+    def test_batches_crlf(self):
+        stdout = io.BytesIO()
+        run_nul_batch(io.BytesIO(b"# A\r\n\r\nB\r\n\0"), stdout)
+        self.assertEqual(b"<div><h1>A</h1><p>B</p></div>\0", stdout.getvalue())
+        stdout = io.BytesIO()
+        run_jsonl_batch(io.BytesIO(b'"# A\\r\\n\\r\\nB"\r\n'), stdout)
+        self.assertEqual({"html": "<div><h1>A</h1><p>B</p></div>"}, json.loads(stdout.getvalue()))
+
+    def test_cli_batch(self):
+        main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        result = subprocess.run([sys.executable, main_path, "--batch", "nul"],
+            input = b"# A\0B", capture_output = True, check = True)
+        self.assertEqual(b"<div><h1>A</h1></div>\0<div><p>B</p></div>\0", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from markdown_blocks import map_markdown
+from depgraph import (reference_path,
+        extract_references,
+        page_node,
+        page_needs_rebuild,
+        resolve_reference,
+        broken_links)
+
+
+class TestDepGraph(unittest.TestCase):
+    def test_reference_path(self):
+        self.assertEqual("majesty", reference_path("/majesty", "index.md"))
+        self.assertEqual("majesty/", reference_path("/majesty/", "index.md"))
+        self.assertEqual("", reference_path("/", "blog/post.md"))
+        self.assertEqual("blog/other.html", reference_path("other.html#top", "blog/post.md"))
+        self.assertEqual("images/a.png", reference_path("../images/a.png", "blog/post.md"))
+        self.assertIsNone(reference_path("https://boot.dev", "index.md"))
+        self.assertIsNone(reference_path("mailto:me@example.com", "index.md"))
+
+    def test_page_node(self):
+        markdown = "# Title\n\n[home](/) and ![pic](/images/a.png) [ext](https://x.org)"
+        node = page_node("index.md", extract_references(markdown), ["template.html"])
+        self.assertEqual(["/", "https://x.org"], node["links"])
+        self.assertEqual(["/images/a.png"], node["images"])
+        self.assertEqual([os.path.join("images", "a.png")], node["assets"])
+
+    def test_references_of_mapped_source(self):
+        markdown = "# Title\n\n[home](/)\n\n```\n![pic](/a.png)\n\n```\n\n[ext](https://x.org)"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.md")
+            with open(path, mode = "w") as f:
+                f.write(markdown)
+            with map_markdown(path) as buffer:
+                self.assertEqual(extract_references(markdown), extract_references(buffer))
+
+    def test_page_needs_rebuild(self):
+        node = page_node("index.md", ([], ["/a.png"]), ["template.html"])
+        self.assertTrue(page_needs_rebuild(None, ["template.html"], set(), set()))
+        self.assertFalse(page_needs_rebuild(node, ["template.html"], set(), set()))
+        self.assertTrue(page_needs_rebuild(node, ["other.html"], set(), set()))
+        self.assertTrue(page_needs_rebuild(node, ["template.html"], {"template.html"}, set()))
+        self.assertTrue(page_needs_rebuild(node, ["template.html"], set(), {"a.png"}))
+
+    def test_resolve_and_broken_links(self):
+        pages = {"index.md", os.path.join("majesty", "index.md"), "about.md"}
+        assets = {"index.css"}
+        self.assertEqual(os.path.join("majesty", "index.md"),
+            resolve_reference("/majesty", "index.md", pages, assets))
+        self.assertEqual("about.md", resolve_reference("/about.html", "index.md", pages, assets))
+        self.assertEqual("index.css", resolve_reference("/index.css", "index.md", pages, assets))
+        self.assertEqual("external", resolve_reference("https://x.org", "index.md", pages, assets))
+        graph = {"index.md": page_node("index.md", (["/majesty", "/missing"], []), [])}
+        self.assertEqual([("index.md", "/missing")], broken_links(graph, pages, assets))
+
+if __name__ == "__main__":
+    unittest.main()
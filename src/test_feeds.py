@@ -0,0 +1,121 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from feeds import (PageIndex,
+        atom_xml,
+        rss_xml,
+        section_listings,
+        sitemap_xml,
+        write_feeds)
+from fixtures import write_file
+
+
+def entry(path, url, title, date, meta = None):
+    return {"path": path, "url": url, "title": title, "date": date, "meta": meta or {}}
+
+
+ENTRIES = [
+    entry("index.md", "/", "Home", "2024-01-01"),
+    entry(os.path.join("blog", "a.md"), "/blog/a.html", "A & B", "2024-03-01",
+        {"description": "First", "author": "Frodo"}),
+    entry(os.path.join("blog", "b.md"), "/blog/b.html", "B", "2024-05-01"),
+    entry(os.path.join("blog", "old", "c.md"), "/blog/old/c.html", "C", "draft"),
+]
+
+
+class TestFeeds(unittest.TestCase):
+    def test_sitemap(self):
+        sitemap = sitemap_xml(ENTRIES, "https://example.com/")
+        self.assertIn("<url><loc>https://example.com/</loc><lastmod>2024-01-01</lastmod></url>",
+            sitemap)
+        self.assertIn("<url><loc>https://example.com/blog/old/c.html</loc></url>", sitemap)
+        self.assertLess(sitemap.index("/blog/a.html"), sitemap.index("/blog/b.html"))
+
+    def test_rss_newest_first_and_escaped(self):
+        rss = rss_xml(ENTRIES, "https://example.com", "Shire")
+        self.assertIn("<title>Shire</title>", rss)
+        self.assertLess(rss.index("/blog/b.html"), rss.index("/blog/a.html"))
+        self.assertIn("<title>A &amp; B</title>", rss)
+        self.assertIn("<pubDate>Fri, 01 Mar 2024 00:00:00 +0000</pubDate>", rss)
+        self.assertIn("<description>First</description>", rss)
+        # Pages without a date are left out of the feeds.
+        self.assertNotIn("c.html", rss)
+
+    def test_atom(self):
+        atom = atom_xml(ENTRIES, "https://example.com", "Shire")
+        self.assertIn("<updated>2024-05-01T00:00:00+00:00</updated>", atom)
+        self.assertIn("<author><name>Frodo</name></author>", atom)
+        self.assertNotIn("c.html", atom)
+
+    def test_section_listings(self):
+        listings = section_listings(ENTRIES)
+        self.assertEqual(["blog", "blog/old"], sorted(listings))
+        self.assertEqual(["blog/old"], listings["blog"]["sections"])
+        self.assertEqual(["/blog/a.html", "/blog/b.html"],
+            [page["url"] for page in listings["blog"]["pages"]])
+
+    def test_page_index_save_and_load(self):
+        index = PageIndex()
+        for page in ENTRIES:
+            index.add(page["path"], page)
+        index.remove("index.md")
+        with tempfile.TemporaryDirectory() as root:
+            index.save(os.path.join(root, "index.json"))
+            loaded = PageIndex()
+            loaded.load(os.path.join(root, "index.json"))
+        self.assertEqual(ENTRIES[1:], loaded.entries())
+
+
+class TestWriteFeeds(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.index = PageIndex()
+        for page in ENTRIES:
+            self.index.add(page["path"], page)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, *path):
+        with open(os.path.join(self.public, *path)) as f:
+            return f.read()
+
+    def test_writes_feeds_and_listings(self):
+        changed = write_feeds(self.index, self.public, "https://example.com", "Shire",
+            self.content, self.template)
+        self.assertEqual(5, len(changed))
+        self.assertIn("https://example.com/blog/</loc>", self.read("sitemap.xml"))
+        listing = self.read("blog", "index.html")
+        self.assertIn("<title>blog</title>", listing)
+        self.assertIn('<a href="/blog/old/">old/</a>', listing)
+        self.assertLess(listing.index("/blog/b.html"), listing.index("/blog/a.html"))
+        self.assertIn('<a href="/blog/old/c.html">C</a>', self.read("blog", "old", "index.html"))
+        self.assertEqual([], write_feeds(self.index, self.public, "https://example.com",
+            "Shire", self.content, self.template))
+
+    def test_stale_listings_removed(self):
+        write_feeds(self.index, self.public, "https://example.com", "Shire",
+            self.content, self.template)
+        self.index.remove(os.path.join("blog", "old", "c.md"))
+        # blog gains a real index page, which replaces the listing.
+        write_file(os.path.join(self.public, "blog", "index.html"), "real")
+        self.index.add(os.path.join("blog", "index.md"),
+            entry(os.path.join("blog", "index.md"), "/blog/", "Blog", "2024-06-01"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_feeds(self.index, self.public, "https://example.com", "Shire",
+                self.content, self.template)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "old")))
+        self.assertEqual("real", self.read("blog", "index.html"))
+        self.assertEqual([], self.index.listings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import io
+import os
+import tempfile
+import unittest
+
+from frontmatter import (read_header,
+        skip_front_matter,
+        scan_page)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_read_header(self):
+        markdown = "---\nTitle: \"Quoted: yes\"\n# comment\ndate: 2024-05-01\ntags: a, b\n---\n\n# Heading\n"
+        self.assertEqual(({"title": "Quoted: yes", "date": "2024-05-01", "tags": "a, b"}, "# Heading"),
+            read_header(io.StringIO(markdown)))
+
+    def test_no_front_matter(self):
+        self.assertEqual(({}, "# Heading"), read_header(io.StringIO("# Heading\n\nText")))
+        self.assertEqual(({}, ""), read_header([]))
+
+    def test_reads_only_the_header(self):
+        lines = iter(["---\n", "title: T\n", "---\n", "# Heading\n", "body\n"])
+        read_header(lines)
+        self.assertEqual(["body\n"], list(lines))
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            read_header(["---", "title: T"])
+        with self.assertRaises(ValueError):
+            read_header(["---", "no separator", "---"])
+
+    def test_skip_front_matter(self):
+        self.assertEqual(["", "# H"], list(skip_front_matter(["---", "a: b", "---", "", "# H"])))
+        self.assertEqual(["# H", "---"], list(skip_front_matter(["# H", "---"])))
+
+    def test_scan_page(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "blog", "post.md")
+            os.makedirs(os.path.dirname(path))
+            with open(path, mode = "w") as f:
+                # The body would not parse, a scan never looks at it.
+                f.write("---\ndate: 2024-05-01\nauthor: Bilbo\n---\n# Post\n\n```\nunclosed")
+            self.assertEqual({"path": os.path.join("blog", "post.md"), "url": "/blog/post.html",
+                "title": "Post", "date": "2024-05-01", "meta": {"date": "2024-05-01", "author": "Bilbo"}},
+                scan_page(path, root))
@@ -1,5 +1,9 @@
+import io
+import os
+import tempfile
 import unittest
 
+from cache import BlockCache
 from htmlnode import ParentNode, LeafNode
 from textnode import TextNode, TextType
 from markdown_blocks import (text_node_to_html_node,
@@ -9,14 +13,24 @@ from markdown_blocks import (text_node_to_html_node,
         split_nodes_link,
         split_nodes_image,
         text_to_textnodes,
+        text_to_textnodes_chained,
         markdown_to_blocks,
+        iter_markdown_blocks,
+        iter_block_ranges,
+        map_markdown,
+        iter_buffer_lines,
+        MarkdownFile,
+        write_markdown_html,
         block_to_block_type,
+        block_to_block_type_regex,
+        block_to_html_node,
         heading_block_to_html,
         code_block_to_html,
         quote_block_to_html,
         UL_block_to_html,
         OL_block_to_html,
         paragraph_block_to_html,
+        markdown_to_html,
         markdown_to_html_node,
         extract_title)
 
@@ -148,6 +162,27 @@ class testTextToTextnode(unittest.TestCase):
                        ]
         self.assertEqual(split_nodes, text_to_textnodes(text))
 
+    def test_literal_inside_bold(self):
+        text = r"**a*b`c** d"
+        split_nodes = [TextNode("a*b`c", TextType.BOLD),
+                       TextNode(" d", TextType.NORMAL)]
+        self.assertEqual(split_nodes, text_to_textnodes(text))
+
+    def test_unclosed_raises(self):
+        for text in ["**bold", "`a*b*`", "**[a](b)**", "*a**b*"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_matches_chained_passes(self):
+        texts = ["",
+                 "plain text",
+                 "![img](a.png)[link](b) *i* **b** `c`",
+                 "!![a](b) and [c](d)![e](f)",
+                 "a****b",
+                 "[x](y) **`** *[not a link]*"]
+        for text in texts:
+            self.assertEqual(text_to_textnodes_chained(text), text_to_textnodes(text))
+
 class testMarkdownToBlocks(unittest.TestCase):
     def test_heading(self):
         markdown = "# This is a heading"
@@ -173,6 +208,90 @@ class testMarkdownToBlocks(unittest.TestCase):
                   "* This is the first list item in a list block\n* This is a list item\n* This is another list item"]
         self.assertEqual(blocks, markdown_to_blocks(markdown))
 
+    def test_code_block_with_blank_lines(self):
+        markdown = "Intro\n\n```\nfirst\n\n\nsecond\n```\n\nOutro"
+        blocks = ["Intro", "```\nfirst\n\n\nsecond\n```", "Outro"]
+        self.assertEqual(blocks, markdown_to_blocks(markdown))
+
+    def test_whitespace_only_blocks_dropped(self):
+        markdown = "Para 1\n\n   \n\nPara 2\n\n\n"
+        self.assertEqual(["Para 1", "Para 2"], markdown_to_blocks(markdown))
+
+    def test_iter_file_lines(self):
+        lines = io.StringIO("# Title\n\nPara one\nstill one\n\n- a\n- b\n")
+        self.assertEqual(["# Title", "Para one\nstill one", "- a\n- b"],
+            list(iter_markdown_blocks(lines)))
+
+    def test_streamed_html_matches(self):
+        markdown = "# Title\n\n```\ncode\n\nmore\n```\n\n> quote\n\n1. one\n2. two"
+        out = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), out)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), out.getvalue())
+
+    def test_mapped_blocks_match(self):
+        markdown = "# Title\n\n```\ncode\n\nmore\n```\n\n  \n\n> quöte\n\n1. one\n2. two\n"
+        self.assertEqual(markdown_to_blocks(markdown), markdown_to_blocks(markdown.encode()))
+
+    def test_front_matter_skipped(self):
+        markdown = "---\ntitle: T\n\ntags: a\n---\n\n# Heading\n\nText"
+        self.assertEqual(["# Heading", "Text"], markdown_to_blocks(markdown))
+        self.assertEqual(["# Heading", "Text"], markdown_to_blocks(markdown.encode()))
+        self.assertEqual(["# Heading", "Text"], list(iter_markdown_blocks(io.StringIO(markdown))))
+        self.assertEqual([], markdown_to_blocks("---\ntitle: T\n---"))
+        self.assertEqual([], markdown_to_blocks(b"---\ntitle: T\n---"))
+
+    def test_unclosed_front_matter(self):
+        for markdown in ("---\ntitle: T\n\n# Heading", b"---\ntitle: T\n\n# Heading"):
+            with self.assertRaises(ValueError):
+                markdown_to_blocks(markdown)
+
+    def test_block_ranges_are_offsets(self):
+        buffer = b"# Title\n\nPara one\nstill one\n\n\n- a"
+        self.assertEqual([(0, 7), (9, 27), (30, 33)], list(iter_block_ranges(buffer)))
+
+class testMapMarkdown(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data):
+        with open(self.path, mode = "wb") as f:
+            f.write(data)
+
+    def test_mapped_file(self):
+        markdown = "# T\u00eftle\n\n```\ncode\n\nmore\n```\n\n- a\n- b\n"
+        self.write(markdown.encode())
+        with map_markdown(self.path) as buffer:
+            self.assertEqual("# T\u00eftle", next(iter_buffer_lines(buffer)))
+            self.assertEqual(markdown_to_html_node(markdown), markdown_to_html_node(buffer))
+        out = io.StringIO()
+        MarkdownFile(self.path).write_html(out)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), out.getvalue())
+
+    def test_mapped_file_with_block_cache(self):
+        markdown = "# T\u00eftle\n\nnote\n\n- a\n- b\n\nnote\n"
+        self.write(markdown.encode())
+        block_cache = BlockCache()
+        with map_markdown(self.path) as buffer:
+            self.assertEqual(markdown_to_html_node(markdown).to_html(),
+                markdown_to_html(buffer, block_cache))
+        out = io.StringIO()
+        MarkdownFile(self.path, block_cache).write_html(out)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), out.getvalue())
+        self.assertEqual((5, 3), block_cache.counts())
+
+    def test_not_mapped(self):
+        self.write(b"")
+        self.assertIsNone(map_markdown(self.path))
+        self.write(b"# Title\r\n\r\nText\r\n")
+        self.assertIsNone(map_markdown(self.path))
+        out = io.StringIO()
+        MarkdownFile(self.path).write_html(out)
+        self.assertEqual("<div><h1>Title</h1><p>Text</p></div>", out.getvalue())
+
 class testBlockToBlockType(unittest.TestCase):
     def test_heading(self):
         block = "##### This is a heading"
@@ -189,6 +308,20 @@ class testBlockToBlockType(unittest.TestCase):
         block_type = "ORDERED LIST"
         self.assertEqual(block_type, block_to_block_type(block))
 
+    def test_matches_regex_classifier(self):
+        blocks = ["# h", "####### h", "```\ncode\n```", "> a\n>b", "> a\nb", "* a\n- b",
+            "* a\n* b", "1. a\n22. b", "1. a\n0. b", "plain text", "- a\r- b", ""]
+        for block in blocks:
+            self.assertEqual(block_to_block_type_regex(block), block_to_block_type(block), block)
+
+    def test_unclosed_code(self):
+        with self.assertRaises(ValueError):
+            block_to_block_type("```\ncode")
+
+    def test_invalid_type(self):
+        with self.assertRaises(ValueError):
+            block_to_html_node("text", "TABLE")
+
 class testHeadingToHtml(unittest.TestCase):
     def test_heading(self):
         block = "#### This is a heading"
@@ -359,6 +492,29 @@ class testMarkdownToHtmlNode(unittest.TestCase):
         ])
         self.assertEqual(htmlnode, markdown_to_html_node(markdown))
 
+class testMarkdownToHtml(unittest.TestCase):
+    def test_matches_tree(self):
+        markdown = ("---\ntitle: x\n---\n# Title\n\n```\ncode\n\nmore\n```\n\n"
+            "> quote\n\n1. one\n2. two\n\nSome **bold** [link](/a)")
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), markdown_to_html(markdown))
+        self.assertEqual(markdown_to_html_node(markdown).to_html(),
+            markdown_to_html(markdown, BlockCache()))
+
+    def test_repeated_blocks_render_once(self):
+        block_cache = BlockCache()
+        footer = "Licensed under *CC BY*"
+        first = markdown_to_html(f"# One\n\n{footer}", block_cache)
+        second = markdown_to_html(f"# Two\n\n{footer}\n\n{footer}", block_cache)
+        self.assertEqual("<div><h1>One</h1><p>Licensed under <i>CC BY</i></p></div>", first)
+        self.assertEqual(markdown_to_html_node(f"# Two\n\n{footer}\n\n{footer}").to_html(),
+            second)
+        self.assertEqual((2, 3), block_cache.counts())
+
+    def test_invalid_block_is_not_cached(self):
+        block_cache = BlockCache()
+        self.assertRaises(ValueError, markdown_to_html, "**open", block_cache)
+        self.assertEqual(0, block_cache.stats()["entries"])
+
 class testExtractHeader(unittest.TestCase):
     def test_header_extract(self):
         markdown = "# This is h1"
@@ -375,6 +531,14 @@ class testExtractHeader(unittest.TestCase):
         string = "This is h1"
         self.assertEqual(string, extract_title(markdown))
 
+    def test_header_from_front_matter(self):
+        self.assertEqual("Meta", extract_title("---\ntitle: Meta\n---\n# Body"))
+        self.assertEqual("Body", extract_title("---\ndate: 2024-01-01\n---\n\n# Body\n\nText"))
+
+    def test_header_not_first_line(self):
+        with self.assertRaises(ValueError):
+            extract_title("Intro\n# This is h1")
+
 if __name__ == "__main__":
     unittest.main()
 
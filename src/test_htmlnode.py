@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode
@@ -25,6 +26,10 @@ class TestHtmlNode(unittest.TestCase):
         node2 = HTMLNode()
         self.assertEqual("", node2.props_to_html())
 
+    def test_slots(self):
+        for node in [HTMLNode(), LeafNode("b", "bold"), ParentNode("p", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_eq(self):
         node1 = HTMLNode("h1", "This is a htmlnode")
         node2 = HTMLNode("h1", "This is a htmlnode")
@@ -81,6 +86,18 @@ class TestParentNode(unittest.TestCase):
             "<h1><h1><h2>This is a leaf node</h2></h1></h1>", parent2.to_html()
         )
 
+    def test_write_html(self):
+        leaf_node = LeafNode("a", "link", {"href": "https://boot.dev"})
+        parent_node = ParentNode("p", [LeafNode(None, "text "), leaf_node])
+        out = io.StringIO()
+        parent_node.write_html(out)
+        self.assertEqual(parent_node.to_html(), out.getvalue())
+
+    def test_write_html_no_children(self):
+        parent_node = ParentNode("p", None)
+        with self.assertRaises(ValueError):
+            parent_node.write_html(io.StringIO())
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,114 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import images
+from images import (hashed_path,
+        ImagePipeline,
+        publish_images,
+        rewrite_images)
+from manifest import hash_file
+from markdown_blocks import markdown_to_html_node
+from sync import stat_tree
+from fixtures import write_file
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.pipeline = ImagePipeline(os.path.join(self.tmp.name, "cache"))
+        write_file(os.path.join(self.static, "images", "a.png"), b"png")
+        write_file(os.path.join(self.static, "index.css"), b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def publish(self, previous = None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return publish_images(self.static, self.public, stat_tree(self.static),
+                self.pipeline, previous)
+
+    def test_hashed_path(self):
+        self.assertEqual("images/a.0123456789ab.png", hashed_path("images/a.png", "0123456789abcdef"))
+        self.assertEqual("a.0123456789ab.480w.webp",
+            hashed_path("a.png", "0123456789abcdef", 480, ".webp"))
+
+    @unittest.skipIf(images.Image is not None, "Pillow re-encodes the image")
+    def test_published_under_hashed_name(self):
+        published = self.publish()
+        self.assertEqual([os.path.join("images", "a.png")], list(published))
+        src = published[os.path.join("images", "a.png")]["src"]
+        self.assertRegex(src, r"a\.[0-9a-f]{12}\.png$")
+        with open(os.path.join(self.public, src), "rb") as f:
+            self.assertEqual(b"png", f.read())
+
+    def test_unchanged_images_are_not_reprocessed(self):
+        first = self.publish()
+        with mock.patch.object(ImagePipeline, "render") as render:
+            self.assertEqual(first, self.publish(first))
+            # A clean build still finds the outputs in the cache.
+            self.assertEqual(first, self.publish())
+        render.assert_not_called()
+
+    def test_missing_cached_output_is_rendered_again(self):
+        entry = self.publish()[os.path.join("images", "a.png")]
+        cache_path = self.pipeline.cache_path(
+            hash_file(os.path.join(self.static, "images", "a.png")), ".png")
+        os.remove(os.path.join(cache_path, "image" + os.path.basename(entry["src"])[len("a"):]))
+        shutil.rmtree(self.public)
+        self.assertEqual(entry, self.publish()[os.path.join("images", "a.png")])
+        self.assertTrue(os.path.isfile(os.path.join(self.public, entry["src"])))
+
+    def test_names_follow_the_current_path(self):
+        first = self.publish()
+        os.rename(os.path.join(self.static, "images", "a.png"),
+            os.path.join(self.static, "b.png"))
+        write_file(os.path.join(self.static, "pics", "c.png"), b"png")
+        with mock.patch.object(ImagePipeline, "render") as render:
+            second = self.publish(first)
+        render.assert_not_called()
+        old_src = first[os.path.join("images", "a.png")]["src"]
+        digest = os.path.basename(old_src)[len("a."):]
+        self.assertEqual("b." + digest, second["b.png"]["src"])
+        self.assertEqual(os.path.join("pics", "c." + digest),
+            second[os.path.join("pics", "c.png")]["src"])
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "b." + digest)))
+        self.assertFalse(os.path.exists(os.path.join(self.public, old_src)))
+
+    def test_changed_image_replaces_old_output(self):
+        first = self.publish()
+        old_src = first[os.path.join("images", "a.png")]["src"]
+        write_file(os.path.join(self.static, "images", "a.png"), b"other png")
+        second = self.publish(first)
+        new_src = second[os.path.join("images", "a.png")]["src"]
+        self.assertNotEqual(old_src, new_src)
+        self.assertFalse(os.path.exists(os.path.join(self.public, old_src)))
+        self.assertTrue(os.path.exists(os.path.join(self.public, new_src)))
+
+    def test_rewrite_tree_and_cached_html_match(self):
+        published = {os.path.join("images", "a.png"): {"src": os.path.join("images", "a.1.png"),
+            "srcset": [[os.path.join("images", "a.1.480w.png"), 480],
+                [os.path.join("images", "a.1.png"), 1000]]}}
+        markdown = "# T\n\n![A](../images/a.png) and ![B](https://x.org/b.png)"
+        html = rewrite_images(markdown_to_html_node(markdown).to_html(), "blog/post.md",
+            published)
+        tree = rewrite_images(markdown_to_html_node(markdown), "blog/post.md", published)
+        self.assertEqual(html, tree.to_html())
+        self.assertIn('<img src="/images/a.1.png" srcset="/images/a.1.480w.png 480w, '
+            '/images/a.1.png 1000w" alt="A">', html)
+        self.assertIn('<img src="https://x.org/b.png" alt="B">', html)
+
+    @unittest.skipIf(images.Image is None, "Pillow is not installed")
+    def test_resized_variants(self):
+        images.Image.new("RGB", (1000, 500), "red").save(
+            os.path.join(self.static, "images", "a.png"))
+        entry = self.publish()[os.path.join("images", "a.png")]
+        self.assertEqual([480, 960, 1000], [width for _, width in entry["srcset"]])
+        with images.Image.open(os.path.join(self.public, entry["srcset"][0][0])) as image:
+            self.assertEqual((480, 240), image.size)
@@ -0,0 +1,390 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from main import (incremental_build,
+        discover_pages,
+        generate_pages)
+from cache import RenderCache
+from feeds import PageIndex
+from images import ImagePipeline
+from markdown_blocks import map_markdown
+from profiling import BuildProfile
+from search import SearchIndex
+from fixtures import (read_file,
+        write_file)
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, "manifest.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\nWorld")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, minify = False):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            incremental_build(self.content, self.template, self.static,
+                self.public, self.manifest, minify = minify)
+        return output.getvalue()
+
+    def build_result(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return incremental_build(self.content, self.template, self.static,
+                self.public, self.manifest)
+
+    def test_first_build_generates_everything(self):
+        self.build()
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "index.html")))
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "blog", "post.html")))
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "index.css")))
+
+    def test_unchanged_rebuild_does_nothing(self):
+        self.build()
+        self.assertEqual("", self.build())
+
+    def test_only_changed_page_rebuilt(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        output = self.build()
+        self.assertIn("index.md", output)
+        self.assertNotIn("post.md", output)
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        output = self.build()
+        self.assertIn("index.md", output)
+        self.assertIn("post.md", output)
+        self.assertNotIn("index.css", output)
+
+    def test_partial_change_rebuilds_pages(self):
+        write_file(self.template, '{% include "nav.html" %}{{ Content }}')
+        write_file(os.path.join(os.path.dirname(self.template), "nav.html"), "<nav></nav>")
+        self.build()
+        write_file(os.path.join(os.path.dirname(self.template), "nav.html"), "<nav>new</nav>")
+        self.assertIn("post.md", self.build())
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertIn("<nav>new</nav>", f.read())
+
+    def test_front_matter_variables(self):
+        write_file(self.template, "<title>{{ Title }}</title>{{ Date }} {{ author }}{{ Content }}")
+        write_file(os.path.join(self.content, "blog", "post.md"),
+            "---\ntitle: Front\ndate: 2024-05-01\nauthor: Bilbo\n---\n\n# Post\n\nWorld")
+        self.build()
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertEqual("<title>Front</title>2024-05-01 Bilbo<div><h1>Post</h1><p>World</p></div>",
+                f.read())
+
+    def test_directory_template_used(self):
+        write_file(os.path.join(self.content, "blog", "_template.html"),
+            "<blog>{{ Breadcrumbs }}{{ Content }}</blog>")
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "_template.html")))
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertTrue(f.read().startswith('<blog><a href="/">Home</a> / <a href="/blog/">blog</a>'))
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertTrue(f.read().startswith("<title>Home</title>"))
+
+    def test_template_change_uses_render_cache(self):
+        cache = RenderCache(os.path.join(self.tmp.name, "cache"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_build(self.content, self.template, self.static,
+                self.public, self.manifest, cache = cache)
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        with mock.patch("main.markdown_to_html_node") as parse:
+            with contextlib.redirect_stdout(io.StringIO()):
+                incremental_build(self.content, self.template, self.static,
+                    self.public, self.manifest, cache = cache)
+        parse.assert_not_called()
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertEqual("<h1>Home</h1><div><h1>Home</h1><p>Hello</p></div>", f.read())
+
+    def test_large_pages_are_streamed(self):
+        self.build()
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            expected = f.read()
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        with mock.patch("main.STREAM_THRESHOLD", 0):
+            with mock.patch("main.markdown_to_html_node") as parse:
+                self.build()
+        parse.assert_not_called()
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertEqual(expected, f.read())
+
+    def test_large_pages_are_mapped(self):
+        self.build()
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            expected = f.read()
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        with mock.patch("main.MMAP_THRESHOLD", 0):
+            with mock.patch("main.map_markdown", wraps = map_markdown) as mapped:
+                self.build()
+        mapped.assert_called_once()
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertEqual(expected, f.read())
+
+    def test_directory_template_change_is_targeted(self):
+        write_file(os.path.join(self.content, "blog", "_template.html"), "{{ Content }}")
+        self.build()
+        write_file(os.path.join(self.content, "blog", "_template.html"), "<b>{{ Content }}</b>")
+        output = self.build()
+        self.assertIn("post.md", output)
+        self.assertNotIn("index.md", output)
+
+    def test_minify_change_rebuilds_all_pages(self):
+        write_file(self.template, "<title>{{ Title }}</title>\n  {{ Content }}")
+        unminified = "<title>Home</title>\n  <div><h1>Home</h1><p>Hello</p></div>"
+        minified = "<title>Home</title><div><h1>Home</h1><p>Hello</p></div>"
+        index = os.path.join(self.public, "index.html")
+        self.build(minify = True)
+        self.assertEqual(minified, read_file(index))
+        output = self.build()
+        self.assertIn("index.md", output)
+        self.assertIn("post.md", output)
+        self.assertEqual(unminified, read_file(index))
+        self.assertNotIn("Generating", self.build())
+        self.build(minify = True)
+        self.assertEqual(minified, read_file(index))
+
+    def test_asset_change_rebuilds_referencing_pages(self):
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![a](/index.css)")
+        self.build()
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0; }")
+        output = self.build()
+        self.assertIn("post.md", output)
+        self.assertNotIn("index.md", output)
+
+    def test_images_are_published_and_rewritten(self):
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![a](/images/a.png)")
+        pipeline = ImagePipeline(os.path.join(self.tmp.name, "cache"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, image_pipeline = pipeline)
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            src = f.read().split('src="/')[1].split('"')[0]
+        self.assertRegex(src, r"^images/a\.[0-9a-f]{12}\.png$")
+        self.assertTrue(os.path.isfile(os.path.join(self.public, src)))
+        write_file(os.path.join(self.static, "images", "a.png"), "new png")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, image_pipeline = pipeline)
+        self.assertIn("post.md", output.getvalue())
+        self.assertNotIn("index.md", output.getvalue())
+        self.assertFalse(os.path.exists(os.path.join(self.public, src)))
+
+    def test_broken_links_reported(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post.html)")
+        self.assertEqual([], self.build_result())
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertEqual([("index.md", "/blog/post.html")], self.build_result())
+
+    def test_links_of_mapped_and_streamed_pages(self):
+        write_file(os.path.join(self.content, "blog", "post.md"),
+            "# Post\n\n[gone](/missing)\n\n![style](/index.css)")
+        post = os.path.join("blog", "post.md")
+        html = os.path.join(self.public, "blog", "post.html")
+        for threshold in ("MMAP_THRESHOLD", "STREAM_THRESHOLD"):
+            if os.path.exists(html):
+                os.remove(html)
+            with mock.patch(f"main.{threshold}", 0):
+                self.assertEqual([(post, "/missing")], self.build_result())
+            # Asset changes still reach the page through its node.
+            write_file(os.path.join(self.static, "index.css"), f"body {{}} /* {threshold} */")
+            self.assertIn("post.md", self.build())
+
+    def test_search_index_updated_incrementally(self):
+        search_index = SearchIndex()
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, search_index = search_index)
+        self.assertEqual({"index.md", os.path.join("blog", "post.md")},
+            set(search_index.documents))
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nMordor")
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, search_index = search_index)
+        self.assertEqual(["index.md"], list(search_index.documents))
+        self.assertIn("mordor", search_index.documents["index.md"]["terms"])
+
+    def test_page_index_updated_incrementally(self):
+        page_index = PageIndex()
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, page_index = page_index)
+        self.assertEqual(["/blog/post.html", "/"],
+            [page["url"] for page in page_index.entries()])
+        write_file(os.path.join(self.content, "blog", "new.md"),
+            "---\ndate: 2024-02-01\n---\n# New\n\nPost")
+        with mock.patch("main.scan_page") as scan_page:
+            with contextlib.redirect_stdout(io.StringIO()):
+                incremental_build(self.content, self.template, self.static, self.public,
+                    self.manifest, page_index = page_index)
+        scan_page.assert_not_called()
+        self.assertEqual({"path": os.path.join("blog", "new.md"), "url": "/blog/new.html",
+            "title": "New", "date": "2024-02-01", "meta": {"date": "2024-02-01"}},
+            page_index.pages[os.path.join("blog", "new.md")])
+        os.remove(os.path.join(self.content, "blog", "new.md"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, page_index = page_index)
+        self.assertEqual(2, len(page_index.pages))
+
+    def test_page_index_filled_without_rendering(self):
+        self.build()
+        page_index = PageIndex()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            incremental_build(self.content, self.template, self.static, self.public,
+                self.manifest, page_index = page_index)
+        self.assertNotIn("Generating", output.getvalue())
+        self.assertEqual(2, len(page_index.pages))
+
+    def test_removed_sources_delete_outputs(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_underscore_directories_are_not_pages(self):
+        write_file(os.path.join(self.content, "_partials", "nav.html"), "<nav></nav>")
+        write_file(os.path.join(self.content, "blog", "_drafts", "wip.md"), "not a page")
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "_partials")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "_drafts")))
+        self.assertEqual(sorted(from_path for from_path, _ in discover_pages(self.content,
+            self.public)), sorted([os.path.join(self.content, "index.md"),
+            os.path.join(self.content, "blog", "post.md")]))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        self.build()
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "index.html")))
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(6):
+            write_file(os.path.join(self.content, f"dir{i % 2}", f"page{i}.md"),
+                f"# Page {i}\n\nBody *{i}*")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_outputs(self):
+        outputs = {}
+        for dir_path, _, file_names in os.walk(self.public):
+            for file_name in file_names:
+                with open(os.path.join(dir_path, file_name)) as f:
+                    outputs[os.path.join(dir_path, file_name)] = f.read()
+        return outputs
+
+    def test_discover_pages_is_sorted(self):
+        pages = discover_pages(self.content, self.public)
+        self.assertEqual(6, len(pages))
+        self.assertEqual(sorted(pages), pages)
+
+    def test_parallel_matches_serial(self):
+        pages = discover_pages(self.content, self.public)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, 1)
+            serial = self.read_outputs()
+            generate_pages(pages, self.template, 3)
+        self.assertEqual(serial, self.read_outputs())
+
+    def test_block_cache_matches_and_is_shared(self):
+        for i in range(6):
+            write_file(os.path.join(self.content, f"dir{i % 2}", f"page{i}.md"),
+                f"# Page {i}\n\nBody *{i}*\n\nShared footer")
+        pages = discover_pages(self.content, self.public)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, 1, block_cache_bytes = 0)
+            uncached = self.read_outputs()
+            for jobs in (1, 3):
+                profile = BuildProfile()
+                generate_pages(pages, self.template, jobs, profile = profile,
+                    block_cache_bytes = 1024 * 1024)
+                self.assertEqual(uncached, self.read_outputs())
+                self.assertEqual(18, profile.block_hits + profile.block_misses)
+                self.assertGreaterEqual(profile.block_hits, 3)
+
+    def test_search_documents_match_with_every_cache(self):
+        pages = discover_pages(self.content, self.public)
+        cache = RenderCache(os.path.join(self.tmp.name, "cache"))
+        documents = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for render_cache, block_cache_bytes in ((None, 0), (None, 1024 * 1024),
+                    (cache, 0), (cache, 0), (cache, 1024 * 1024)):
+                search_index = SearchIndex()
+                generate_pages(pages, self.template, 1, self.content, cache = render_cache,
+                    search_index = search_index, block_cache_bytes = block_cache_bytes)
+                documents.append(search_index.documents)
+        self.assertEqual({"page": 5, "body": 1},
+            documents[0][os.path.join("dir0", "page0.md")]["terms"])
+        for other in documents[1:]:
+            self.assertEqual(documents[0], other)
+
+    def test_background_writers_match_synchronous(self):
+        pages = discover_pages(self.content, self.public)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, 1)
+            synchronous = self.read_outputs()
+            generate_pages(pages, self.template, 2, writers = 2)
+        self.assertEqual(synchronous, self.read_outputs())
+
+    def test_minified_pages(self):
+        write_file(self.template, "<html>\n  <title>{{ Title }}</title>\n  {{ Content }}\n</html>")
+        pages = discover_pages(self.content, self.public)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, 1, minify = True)
+        with open(os.path.join(self.public, "dir0", "page0.html")) as f:
+            self.assertEqual("<html><title>Page 0</title><div><h1>Page 0</h1>"
+                "<p>Body <i>0</i></p></div></html>", f.read())
+
+    def test_profile_records_every_page(self):
+        pages = discover_pages(self.content, self.public)
+        profile = BuildProfile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, 2, self.content, profile)
+        self.assertEqual(6, len(profile.pages))
+        self.assertIn("write", profile.pages[pages[0][0]])
+
+    def test_errors_are_aggregated(self):
+        write_file(os.path.join(self.content, "bad1.md"), "no title")
+        write_file(os.path.join(self.content, "bad2.md"), "no title either")
+        pages = discover_pages(self.content, self.public)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(RuntimeError) as cm:
+                generate_pages(pages, self.template, 2)
+        self.assertIn("2 page(s) failed", str(cm.exception))
+        self.assertIn("bad1.md", str(cm.exception))
+        self.assertIn("bad2.md", str(cm.exception))
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "dir0", "page0.html")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from manifest import (hash_file,
+        list_files,
+        hash_tree,
+        diff_entries,
+        empty_manifest,
+        load_manifest,
+        save_manifest)
+from fixtures import write_file
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_list_files_sorted_relative(self):
+        write_file(os.path.join(self.root, "b.md"), "b")
+        write_file(os.path.join(self.root, "a", "index.md"), "a")
+        self.assertEqual([os.path.join("a", "index.md"), "b.md"], list_files(self.root))
+
+    def test_list_files_missing_root(self):
+        self.assertEqual([], list_files(os.path.join(self.root, "missing")))
+
+    def test_hash_tree_reuses_unchanged_entries(self):
+        write_file(os.path.join(self.root, "a.md"), "a")
+        entries = hash_tree(self.root)
+        entries["a.md"][2] = "cached"
+        self.assertEqual("cached", hash_tree(self.root, entries)["a.md"][2])
+
+    def test_diff_entries(self):
+        path = os.path.join(self.root, "a.md")
+        write_file(path, "a")
+        old = {"a.md": [1, 0, hash_file(path)], "gone.md": [1, 0, "x"]}
+        write_file(path, "changed")
+        new = hash_tree(self.root)
+        changed, removed = diff_entries(old, new)
+        self.assertEqual({"a.md"}, changed)
+        self.assertEqual(["gone.md"], removed)
+
+    def test_save_and_load(self):
+        path = os.path.join(self.root, "manifest.json")
+        self.assertIsNone(load_manifest(path))
+        manifest = empty_manifest()
+        manifest["template"] = "abc"
+        save_manifest(manifest, path)
+        self.assertEqual(manifest, load_manifest(path))
+
+    def test_load_rejects_other_versions(self):
+        path = os.path.join(self.root, "manifest.json")
+        write_file(path, '{"version": -1}')
+        self.assertIsNone(load_manifest(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import unittest
+
+from cache import BlockCache
+from markdown_blocks import markdown_to_html_node
+from profiling import (STAGES,
+        StageClock,
+        BuildProfile,
+        profiled_markdown_to_html,
+        profiled_markdown_to_html_node)
+
+
+class TestProfiling(unittest.TestCase):
+    def test_profiled_conversion_matches(self):
+        markdown = "# Title\n\nSome *text* here\n\n- one\n- two"
+        timings = {}
+        self.assertEqual(markdown_to_html_node(markdown).to_html(),
+            profiled_markdown_to_html_node(markdown, timings).to_html())
+        self.assertEqual({"blocks", "classify", "inline"}, set(timings))
+
+    def test_profiled_block_cache_conversion_matches(self):
+        markdown = "# Title\n\nSame\n\nSame"
+        timings = {}
+        self.assertEqual(markdown_to_html_node(markdown).to_html(),
+            profiled_markdown_to_html(markdown, timings, BlockCache()))
+        self.assertEqual({"blocks", "cache", "classify", "inline", "serialize", "search"},
+            set(timings))
+
+    def test_clock_without_timings_is_noop(self):
+        with StageClock(None)("read"):
+            pass
+
+    def test_clock_accumulates(self):
+        timings = {}
+        clock = StageClock(timings)
+        with clock("read"):
+            pass
+        with clock("read"):
+            pass
+        self.assertEqual(["read"], list(timings))
+
+    def test_summary(self):
+        profile = BuildProfile()
+        profile.record("a.md", {"read": 1.0, "inline": 2.0})
+        profile.record("b.md", {"read": 0.5})
+        profile.finish()
+        summary = profile.summary(count = 1)
+        self.assertEqual(2, summary["pages"])
+        self.assertEqual(1.5, summary["stage_totals"]["read"])
+        self.assertEqual(list(STAGES), list(summary["stage_totals"]))
+        self.assertEqual([{"page": "a.md", "seconds": 3.0}], summary["slowest_pages"])
+        self.assertIn("b.md", json.loads(profile.to_json())["page_timings"])
+        self.assertIn("Slowest pages:", profile.format_report())
+        self.assertNotIn("Block cache", profile.format_report())
+        profile.record_blocks(3, 1)
+        self.assertEqual({"hits": 3, "misses": 1}, profile.summary()["block_cache"])
+        self.assertIn("Block cache: 3 of 4 blocks reused (75.0%)", profile.format_report())
+
+if __name__ == "__main__":
+    unittest.main()
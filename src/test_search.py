@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache
+from markdown_blocks import (collect_text,
+        markdown_to_html,
+        markdown_to_html_node)
+from search import (tokenize,
+        search_document,
+        shard_key,
+        SearchIndex)
+
+
+class TestSearch(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(["lord", "rings", "x2"], tokenize("The Lord of the Rings, x2!"))
+
+    def test_document_from_tree(self):
+        html_node = markdown_to_html_node("# Gandalf\n\nA *wizard* and ![Rivendell](/a.png)")
+        text = ([], [])
+        collect_text(html_node, text[1], text[0])
+        document = search_document("/", "Home", text)
+        self.assertEqual({"gandalf": 5, "wizard": 1, "rivendell": 1}, document["terms"])
+
+    def test_document_from_block_cache_matches_tree(self):
+        markdown = "# Gandalf\n\n- one **ring**\n\n> quote\n\n- one **ring**"
+        tree_text = ([], [])
+        collect_text(markdown_to_html_node(markdown), tree_text[1], tree_text[0])
+        block_cache = BlockCache()
+        for _ in range(2):
+            text = ([], [])
+            markdown_to_html(markdown, block_cache, text)
+            self.assertEqual(search_document("/", "Home", tree_text),
+                search_document("/", "Home", text))
+        self.assertEqual((5, 3), block_cache.counts())
+
+    def test_document_without_text(self):
+        self.assertEqual({}, search_document("/", "Home", None)["terms"])
+
+    def test_shard_key(self):
+        self.assertEqual("g", shard_key("gandalf"))
+        self.assertEqual("_", shard_key("éowyn"))
+
+    def test_build_and_write(self):
+        index = SearchIndex()
+        index.add("b.md", {"url": "/b.html", "title": "B", "terms": {"ring": 1}})
+        index.add("a.md", {"url": "/", "title": "A", "terms": {"ring": 2, "elf": 1}})
+        docs, shards = index.build()
+        self.assertEqual([["/", "A"], ["/b.html", "B"]], docs)
+        self.assertEqual([[0, 2], [1, 1]], shards["r"]["ring"])
+        with tempfile.TemporaryDirectory() as root:
+            index.write(root)
+            with open(os.path.join(root, "index-e.json")) as f:
+                self.assertEqual({"elf": [[0, 1]]}, json.load(f))
+            index.remove("a.md")
+            index.write(root)
+            self.assertFalse(os.path.exists(os.path.join(root, "index-e.json")))
+
+    def test_save_and_load(self):
+        index = SearchIndex()
+        index.add("a.md", {"url": "/", "title": "A", "terms": {"ring": 2}})
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "docs.json")
+            index.save(path)
+            loaded = SearchIndex()
+            loaded.load(path)
+        self.assertEqual(index.documents, loaded.documents)
+
+if __name__ == "__main__":
+    unittest.main()
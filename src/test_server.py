@@ -0,0 +1,76 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from server import (snapshot,
+        inject_reload_script,
+        serve,
+        watch,
+        BuildState,
+        RELOAD_SCRIPT)
+from fixtures import write_file
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_inject_before_body_close(self):
+        html = inject_reload_script(b"<body><p>hi</p></body></html>")
+        self.assertEqual(b"<body><p>hi</p>" + RELOAD_SCRIPT + b"</body></html>", html)
+
+    def test_inject_without_body(self):
+        self.assertEqual(b"<p>hi</p>" + RELOAD_SCRIPT, inject_reload_script(b"<p>hi</p>"))
+
+    def test_snapshot_detects_changes(self):
+        path = os.path.join(self.root, "content", "index.md")
+        write_file(path, "# Home")
+        template = os.path.join(self.root, "template.html")
+        write_file(template, "{{ Content }}")
+        before = snapshot([os.path.join(self.root, "content"), template])
+        self.assertEqual({path, template}, set(before))
+        write_file(path, "# Home, changed")
+        self.assertNotEqual(before, snapshot([os.path.join(self.root, "content"), template]))
+
+    def test_watch_rebuilds_on_change(self):
+        path = os.path.join(self.root, "content", "index.md")
+        write_file(path, "# Home")
+        state = BuildState()
+        rebuilt = threading.Event()
+
+        def build():
+            rebuilt.set()
+            state.stop.set()
+
+        watched = lambda: [os.path.join(self.root, "content")]
+        watcher = threading.Thread(target = watch,
+            args = (build, watched, state, 0.01, snapshot(watched())))
+        watcher.start()
+        write_file(os.path.join(self.root, "content", "new.md"), "# New")
+        self.assertTrue(rebuilt.wait(5))
+        watcher.join(5)
+        self.assertEqual(1, state.build_id)
+
+    def test_serve_after_failed_first_build(self):
+        def build():
+            raise RuntimeError("1 page(s) failed to build")
+
+        output = io.StringIO()
+        with mock.patch("server.ThreadingHTTPServer") as server_class:
+            httpd = server_class.return_value.__enter__.return_value
+            httpd.serve_forever.side_effect = KeyboardInterrupt
+            with contextlib.redirect_stdout(output):
+                serve(self.root, build, lambda: [self.root], port = 0)
+        httpd.serve_forever.assert_called_once()
+        self.assertIn("Build failed: RuntimeError: 1 page(s) failed to build", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
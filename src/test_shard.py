@@ -0,0 +1,97 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from main import (build_shard,
+        discover_pages,
+        generate_pages)
+from manifest import list_files
+from shard import (parse_shard,
+        shard_of,
+        check_shards,
+        merge_shards)
+from fixtures import write_file
+
+
+def read_tree(root):
+    ret = {}
+    for path in list_files(root):
+        with open(os.path.join(root, path)) as f:
+            ret[path] = f.read()
+    return ret
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.shards = os.path.join(root, "shards")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(20):
+            write_file(os.path.join(self.content, f"dir{i % 3}", f"page{i}.md"),
+                f"# Page {i}\n\nBody *{i}*")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_shards(self, count, search = False):
+        shard_dirs = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index in range(1, count + 1):
+                shard_dir = os.path.join(self.shards, f"{index}-of-{count}")
+                build_shard(self.content, self.template, shard_dir, index, count, search = search)
+                shard_dirs.append(shard_dir)
+        return shard_dirs
+
+    def merge(self, shard_dirs):
+        public = os.path.join(self.tmp.name, "merged")
+        with contextlib.redirect_stdout(io.StringIO()):
+            documents = merge_shards(shard_dirs, check_shards(shard_dirs), public)
+        return public, documents
+
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), parse_shard("2/4"))
+        for text in ("0/4", "5/4", "1/0", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_partition_is_stable_and_separator_independent(self):
+        self.assertEqual(shard_of("dir0/page0.md", 7), shard_of(os.path.join("dir0", "page0.md"), 7))
+        counts = [0, 0, 0, 0]
+        for i in range(400):
+            counts[shard_of(f"page{i}.md", 4) - 1] += 1
+        self.assertTrue(all(count > 50 for count in counts), counts)
+
+    def test_merged_shards_match_single_build(self):
+        single = os.path.join(self.tmp.name, "single")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(discover_pages(self.content, single), self.template, 1, self.content)
+        public, documents = self.merge(self.build_shards(3, search = True))
+        self.assertEqual(read_tree(single), read_tree(public))
+        self.assertEqual(20, len(documents))
+
+    def test_missing_shard_is_rejected(self):
+        shard_dirs = self.build_shards(3)
+        with self.assertRaises(ValueError) as cm:
+            check_shards(shard_dirs[:2])
+        self.assertIn("missing shard(s) 3 of 3", str(cm.exception))
+
+    def test_modified_output_is_rejected(self):
+        shard_dirs = self.build_shards(2)
+        path = os.path.join(shard_dirs[0], list_files(shard_dirs[0])[0])
+        write_file(path, "tampered")
+        with self.assertRaises(ValueError):
+            check_shards(shard_dirs)
+
+    def test_shards_from_different_inputs_are_rejected(self):
+        shard_dirs = self.build_shards(2)
+        write_file(os.path.join(self.content, "new.md"), "# New")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_shard(self.content, self.template, shard_dirs[1], 2, 2)
+        with self.assertRaises(ValueError) as cm:
+            check_shards(shard_dirs)
+        self.assertIn("different inputs", str(cm.exception))
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from sync import (needs_copy,
+        transfer_file,
+        sync_static)
+from fixtures import (read_file,
+        write_file)
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, previous = None, method = "copy", minify = False):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            entries = sync_static(self.static, self.public, previous, method, minify)
+        return entries, output.getvalue()
+
+    def test_unchanged_files_are_skipped(self):
+        entries, _ = self.sync()
+        self.assertFalse(needs_copy(os.path.join(self.static, "index.css"),
+            os.path.join(self.public, "index.css")))
+        self.assertTrue(needs_copy(os.path.join(self.static, "index.css"),
+            os.path.join(self.public, "index.css"), True))
+        _, output = self.sync(entries)
+        self.assertEqual("", output)
+
+    def test_changed_file_is_copied(self):
+        entries, _ = self.sync()
+        write_file(os.path.join(self.static, "index.css"), "body { color: red; }")
+        _, output = self.sync(entries)
+        self.assertIn("index.css", output)
+        self.assertNotIn("a.png", output)
+        self.assertEqual("body { color: red; }", read_file(os.path.join(self.public, "index.css")))
+
+    def test_stale_files_removed(self):
+        entries, _ = self.sync()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.sync(entries)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+    def test_hardlink(self):
+        self.sync(method = "hardlink")
+        source = os.stat(os.path.join(self.static, "index.css"))
+        dest = os.stat(os.path.join(self.public, "index.css"))
+        self.assertEqual(source.st_ino, dest.st_ino)
+
+    def test_replacing_hardlink_leaves_source_untouched(self):
+        self.sync(method = "hardlink")
+        other = os.path.join(self.tmp.name, "other.css")
+        write_file(other, "replaced")
+        transfer_file(other, os.path.join(self.public, "index.css"))
+        self.assertEqual("body {}", read_file(os.path.join(self.static, "index.css")))
+
+    def test_reflink_falls_back_to_copy(self):
+        self.sync(method = "reflink")
+        self.assertEqual("png", read_file(os.path.join(self.public, "images", "a.png")))
+
+    def test_minified_css(self):
+        write_file(os.path.join(self.static, "index.css"), "body {\n    margin: 0;\n}\n")
+        entries, _ = self.sync(minify = True)
+        self.assertEqual("body{margin:0;}", read_file(os.path.join(self.public, "index.css")))
+        _, output = self.sync(entries, minify = True)
+        self.assertEqual("", output)
+        _, output = self.sync(entries)
+        self.assertIn("index.css", output)
+        self.assertEqual("body {\n    margin: 0;\n}\n", read_file(os.path.join(self.public, "index.css")))
+
+    def test_already_minified_css_is_skipped(self):
+        write_file(os.path.join(self.static, "index.css"), "body{}")
+        entries, output = self.sync(minify = True)
+        self.assertIn("index.css", output)
+        self.assertEqual([True], entries["index.css"][2:])
+        self.assertEqual([False], entries[os.path.join("images", "a.png")][2:])
+        _, output = self.sync(entries, minify = True)
+        self.assertEqual("", output)
+
+    def test_minify_leaves_hardlinked_source_untouched(self):
+        entries, _ = self.sync(method = "hardlink")
+        self.sync(entries, minify = True)
+        self.assertEqual("body {}", read_file(os.path.join(self.static, "index.css")))
+        self.assertEqual("body{}", read_file(os.path.join(self.public, "index.css")))
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            self.sync(method = "teleport")
+
+if __name__ == "__main__":
+    unittest.main()
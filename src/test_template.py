@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import (compile_template,
+        load_template,
+        find_template,
+        page_url,
+        breadcrumbs)
+from fixtures import write_file
+
+
+def render(template, variables):
+    out = io.StringIO()
+    template.render(out, variables)
+    return out.getvalue()
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_variables(self):
+        template = compile_template("<title>{{ Title }}</title>{{Date}}", self.root)
+        self.assertEqual("<title>Home</title>2024-01-01",
+            render(template, {"Title": "Home", "Date": "2024-01-01"}))
+
+    def test_unknown_variable_left_untouched(self):
+        template = compile_template("{{ Title }} {{ Missing }}", self.root)
+        self.assertEqual("Home {{ Missing }}", render(template, {"Title": "Home"}))
+
+    def test_every_content_slot_streams_node(self):
+        html_node = ParentNode("div", [LeafNode("b", "hi")])
+        template = compile_template("<main>{{ Content }}</main><aside>{{ Content }}</aside>",
+            self.root)
+        self.assertEqual("<main><div><b>hi</b></div></main><aside><div><b>hi</b></div></aside>",
+            render(template, {"Content": html_node}))
+
+    def test_include(self):
+        write_file(os.path.join(self.root, "partials", "nav.html"),
+            '<nav>{{ Title }}{% include "links.html" %}</nav>')
+        write_file(os.path.join(self.root, "partials", "links.html"), "<a></a>")
+        template = compile_template('{% include "partials/nav.html" %}', self.root)
+        self.assertEqual("<nav>Home<a></a></nav>", render(template, {"Title": "Home"}))
+        self.assertEqual(2, len(template.dependencies))
+
+    def test_recursive_include_raises(self):
+        write_file(os.path.join(self.root, "loop.html"), '{% include "loop.html" %}')
+        with self.assertRaises(ValueError):
+            load_template(os.path.join(self.root, "loop.html"))
+
+    def test_load_template_is_cached_until_modified(self):
+        path = os.path.join(self.root, "template.html")
+        write_file(path, "one")
+        template = load_template(path)
+        self.assertIs(template, load_template(path))
+        write_file(path, "two")
+        os.utime(path, ns = (0, 0))
+        self.assertEqual("two", render(load_template(path), {}))
+
+    def test_find_template(self):
+        content = os.path.join(self.root, "content")
+        write_file(os.path.join(content, "blog", "_template.html"), "blog")
+        write_file(os.path.join(content, "blog", "2024", "post.md"), "# Post")
+        page = os.path.join(content, "blog", "2024", "post.md")
+        self.assertEqual(os.path.join(content, "blog", "_template.html"),
+            find_template(page, content, "default.html"))
+        self.assertEqual("default.html",
+            find_template(os.path.join(content, "index.md"), content, "default.html"))
+
+    def test_page_url_and_breadcrumbs(self):
+        self.assertEqual("/", page_url("index.md"))
+        self.assertEqual("/blog/post.html", page_url(os.path.join("blog", "post.md")))
+        self.assertEqual('<a href="/">Home</a> / <a href="/blog/">blog</a> / post',
+            breadcrumbs("/blog/post.html"))
+
+if __name__ == "__main__":
+    unittest.main()
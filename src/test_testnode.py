@@ -34,5 +34,11 @@ class TestTextNode(unittest.TestCase):
                 "TextNode(This is a text node, Bold, https://www.boot.dev)", repr(node)
         )
 
+    def test_slots(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,134 @@
+import http.client
+import json
+import socket
+import threading
+import unittest
+
+from cache import MemoryCache
+from worker import (RenderBatcher,
+        RenderWorker,
+        make_render_server,
+        percentile)
+
+
+class TestRenderBatcher(unittest.TestCase):
+    def test_queued_requests_render_as_one_batch(self):
+        cache = MemoryCache()
+        batcher = RenderBatcher(cache)
+        # Queued before the thread starts, so they are all pending at once.
+        futures = [batcher.submit(markdown) for markdown in ("# A", "B", "# A", "**open")]
+        batcher.start()
+        self.assertEqual("<div><h1>A</h1></div>", futures[0].result())
+        self.assertEqual("<div><p>B</p></div>", futures[1].result())
+        self.assertEqual("<div><h1>A</h1></div>", futures[2].result())
+        self.assertRaises(ValueError, futures[3].result)
+        batcher.stop()
+        self.assertEqual({"batches": 1, "mean_batch_size": 4.0, "rendered": 3, "queued": 0},
+            batcher.stats())
+        self.assertEqual("<div><p>B</p></div>", cache.get("B"))
+
+    def test_block_cache_stats(self):
+        worker = RenderWorker(block_cache_bytes = 1024)
+        worker.batcher.start()
+        self.assertEqual([{"html": "<div><p>Same</p></div>"},
+            {"html": "<div><p>Same</p><p>x</p></div>"}], worker.render_many(["Same", "Same\n\nx"]))
+        worker.batcher.stop()
+        self.assertEqual(1, worker.summary()["block_cache"]["hits"])
+
+    def test_max_batch(self):
+        batcher = RenderBatcher(max_batch = 2)
+        futures = [batcher.submit(str(number)) for number in range(5)]
+        batcher.start()
+        self.assertEqual(["<div><p>4</p></div>"], [futures[4].result()])
+        batcher.stop()
+        self.assertEqual(3, batcher.stats()["batches"])
+
+
+class TestRenderServer(unittest.TestCase):
+    def setUp(self):
+        self.worker = RenderWorker()
+        self.worker.batcher.start()
+        self.server = make_render_server(self.worker, port = 0)
+        self.thread = threading.Thread(target = self.server.serve_forever,
+            kwargs = {"poll_interval": 0.01}, daemon = True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.worker.batcher.stop()
+
+    def request(self, method, path, body = None):
+        self.connection.request(method, path, body)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def test_render_reuses_connection_and_cache(self):
+        for _ in range(3):
+            self.assertEqual((200, b"<div><h1>Hi</h1></div>"),
+                self.request("POST", "/render", b"# Hi"))
+        status, body = self.request("GET", "/stats")
+        stats = json.loads(body)
+        self.assertEqual(3, stats["requests"])
+        self.assertEqual(2, stats["cache"]["hits"])
+        self.assertEqual(1, stats["cache"]["misses"])
+        self.assertEqual(1, stats["batching"]["rendered"])
+        self.assertGreater(stats["latency_ms"]["p99"], 0)
+
+    def test_render_crlf(self):
+        self.assertEqual((200, b"<div><h1>A</h1><ul><li>x</li><li>y</li></ul></div>"),
+            self.request("POST", "/render", b"# A\r\n\r\n* x\r\n* y\r\n"))
+
+    def test_render_error(self):
+        status, body = self.request("POST", "/render", b"**open")
+        self.assertEqual(422, status)
+        self.assertIn(b"ValueError", body)
+        self.assertEqual(1, json.loads(self.request("GET", "/stats")[1])["errors"])
+
+    def test_render_batch(self):
+        status, body = self.request("POST", "/render/batch", json.dumps(["# A", "**open", "# A"]))
+        self.assertEqual(200, status)
+        results = json.loads(body)
+        self.assertEqual({"html": "<div><h1>A</h1></div>"}, results[0])
+        self.assertIn("error", results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(400, self.request("POST", "/render/batch", b"{}")[0])
+        self.assertEqual(404, self.request("POST", "/nope", b"")[0])
+
+
+    def raw_request(self, data):
+        # Returns everything the server sends before closing the connection.
+        with socket.create_connection(self.server.server_address, timeout = 5) as sock:
+            sock.sendall(data)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+
+    def test_negative_content_length(self):
+        response = self.raw_request(b"POST /render HTTP/1.1\r\nHost: x\r\n"
+            b"Content-Length: -1\r\n\r\n# A")
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 "))
+
+    def test_missing_content_length_closes_connection(self):
+        # The body must not be read as a second request.
+        response = self.raw_request(b"POST /render HTTP/1.1\r\nHost: x\r\n\r\n"
+            b"GET /stats HTTP/1.1\r\nHost: x\r\n\r\n")
+        self.assertTrue(response.startswith(b"HTTP/1.1 411 "))
+        self.assertNotIn(b"HTTP/1.1 200", response)
+
+
+class TestPercentile(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(100))
+        self.assertEqual(50, percentile(values, 0.5))
+        self.assertEqual(99, percentile(values, 0.99))
+        self.assertEqual(0.0, percentile([], 0.99))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from writer import (write_if_changed,
+        make_dirs,
+        OutputWriter)
+
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_identical_bytes_skipped(self):
+        path = os.path.join(self.root, "page.html")
+        self.assertTrue(write_if_changed(path, b"<p>hi</p>"))
+        os.utime(path, ns = (0, 0))
+        self.assertFalse(write_if_changed(path, b"<p>hi</p>"))
+        self.assertEqual(0, os.stat(path).st_mtime_ns)
+        self.assertTrue(write_if_changed(path, b"<p>ho</p>"))
+
+    def test_missing_directory_created(self):
+        path = os.path.join(self.root, "a", "b", "page.html")
+        self.assertTrue(write_if_changed(path, b"x"))
+
+    def test_make_dirs(self):
+        make_dirs([os.path.join(self.root, "a", "x.md"), os.path.join(self.root, "b", "c", "y.md")])
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "a")))
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "b", "c")))
+
+    def test_output_writer(self):
+        paths = [os.path.join(self.root, f"page{i}.html") for i in range(10)]
+        with OutputWriter(max_workers = 2, max_pending = 3) as writer:
+            for path in paths:
+                writer.submit(path, "<p>é</p>")
+        self.assertEqual(10, writer.written)
+        with open(paths[0], encoding = "utf-8") as f:
+            self.assertEqual("<p>é</p>", f.read())
+        writer = OutputWriter()
+        writer.submit(paths[0], "<p>é</p>")
+        self.assertEqual([], writer.close())
+        self.assertEqual(1, writer.skipped)
+
+    def test_errors_collected(self):
+        os.mkdir(os.path.join(self.root, "dir.html"))
+        writer = OutputWriter()
+        writer.submit(os.path.join(self.root, "dir.html"), "x")
+        errors = writer.close()
+        self.assertEqual(1, len(errors))
+        self.assertIn("dir.html", errors[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,8 @@ class TextType(Enum):
 
 class TextNode():
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url = None):
         self.text = text
         self.text_type = text_type
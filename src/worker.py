@@ -0,0 +1,281 @@
+import functools
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache import (BlockCache,
+    MemoryCache)
+from convert import convert
+
+MAX_BATCH = 64
+LATENCY_WINDOW = 4096
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+class RenderBatcher():
+    # Renders on one thread. Requests that arrive while a batch renders are
+    # taken together as the next batch, and identical documents within a
+    # batch are rendered once. Handler threads only wait, so they do not
+    # fight over the GIL while rendering.
+
+    def __init__(self, cache = None, max_batch = MAX_BATCH, block_cache = None):
+        self.cache = cache
+        self.block_cache = block_cache
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.batched = 0
+        self.rendered = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+
+    def stop(self):
+        self.pending.put(None)
+        self.thread.join()
+
+    def submit(self, markdown):
+        future = Future()
+        self.pending.put((markdown, future))
+        return future
+
+    def render(self, markdown):
+        return self.submit(markdown).result()
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.render_batch(batch)
+                    return
+                batch.append(item)
+            self.render_batch(batch)
+
+    def render_batch(self, batch):
+        documents = {}
+        for markdown, future in batch:
+            documents.setdefault(markdown, []).append(future)
+        for markdown, futures in documents.items():
+            # Callers looked the cache up already, looking again would count
+            # every miss twice.
+            try:
+                html = convert(markdown, None, self.block_cache)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            if self.cache is not None:
+                self.cache.put(markdown, html)
+            for future in futures:
+                future.set_result(html)
+        self.batches += 1
+        self.batched += len(batch)
+        self.rendered += len(documents)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "mean_batch_size": self.batched / self.batches if self.batches != 0 else 0.0,
+            "rendered": self.rendered,
+            "queued": self.pending.qsize(),
+        }
+
+def percentile(values, fraction):
+    # values must be sorted.
+    if len(values) == 0:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class WorkerStats():
+    # Request counts and the latencies of the last LATENCY_WINDOW requests.
+
+    def __init__(self, window = LATENCY_WINDOW):
+        self.start = time.perf_counter()
+        self.requests = 0
+        self.documents = 0
+        self.errors = 0
+        self.latencies = deque(maxlen = window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds, documents, errors):
+        with self.lock:
+            self.requests += 1
+            self.documents += documents
+            self.errors += errors
+            self.latencies.append(seconds)
+
+    def summary(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            uptime = time.perf_counter() - self.start
+            return {
+                "uptime": uptime,
+                "requests": self.requests,
+                "documents": self.documents,
+                "errors": self.errors,
+                "documents_per_second": self.documents / uptime if uptime > 0 else 0.0,
+                "latency_ms": {
+                    "p50": percentile(latencies, 0.5) * 1000,
+                    "p90": percentile(latencies, 0.9) * 1000,
+                    "p99": percentile(latencies, 0.99) * 1000,
+                    "max": (latencies[-1] if len(latencies) != 0 else 0.0) * 1000,
+                },
+            }
+
+class RenderWorker():
+
+    def __init__(self, cache_bytes = 64 * 1024 * 1024, max_batch = MAX_BATCH,
+            block_cache_bytes = 0):
+        self.cache = MemoryCache(cache_bytes)
+        self.block_cache = None
+        if block_cache_bytes > 0:
+            self.block_cache = BlockCache(block_cache_bytes)
+        self.batcher = RenderBatcher(self.cache, max_batch, self.block_cache)
+        self.stats = WorkerStats()
+
+    def render(self, markdown):
+        # Cache hits are answered on the calling thread without queueing.
+        html = self.cache.get(markdown)
+        if html is None:
+            html = self.batcher.render(markdown)
+        return html
+
+    def render_many(self, documents):
+        # Submits every miss before waiting on any, so one request's
+        # documents share batches.
+        results = [self.cache.get(markdown) for markdown in documents]
+        futures = [self.batcher.submit(markdown) if html is None else None
+            for markdown, html in zip(documents, results)]
+        ret = []
+        for html, future in zip(results, futures):
+            if future is not None:
+                try:
+                    html = future.result()
+                except Exception as e:
+                    ret.append({"error": f"{type(e).__name__}: {e}"})
+                    continue
+            ret.append({"html": html})
+        return ret
+
+    def summary(self):
+        ret = self.stats.summary()
+        ret["cache"] = self.cache.stats()
+        ret["batching"] = self.batcher.stats()
+        if self.block_cache is not None:
+            ret["block_cache"] = self.block_cache.stats()
+        return ret
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    # POST /render takes markdown and answers text/html. POST /render/batch
+    # takes a JSON list of markdown strings and answers a JSON list of
+    # {"html": ...} or {"error": ...}. GET /stats reports the worker stats.
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, with Nagle on a kept
+    # alive connection then waits on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def __init__(self, *args, worker = None, **kwargs):
+        self.worker = worker
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/stats":
+            self.send_bytes(404, b"Not found\n", "text/plain")
+            return
+        self.send_bytes(200, json.dumps(self.worker.summary(), indent = 1).encode(),
+            "application/json")
+
+    def do_POST(self):
+        start = time.perf_counter()
+        path = self.path.split("?", 1)[0]
+        # Any response sent before the body is read closes the connection,
+        # otherwise the unread body would be parsed as the next request.
+        if path not in ("/render", "/render/batch"):
+            self.close_connection = True
+            self.send_bytes(404, b"Not found\n", "text/plain")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.close_connection = True
+            self.send_bytes(411, b"Content-Length required\n", "text/plain")
+            return
+        if length < 0:
+            self.close_connection = True
+            self.send_bytes(400, b"Invalid Content-Length\n", "text/plain")
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.send_bytes(413, b"Request too large\n", "text/plain")
+            return
+        body = self.rfile.read(length)
+        if path == "/render":
+            self.render_one(body, start)
+        else:
+            self.render_batch(body, start)
+
+    def render_one(self, body, start):
+        try:
+            html = self.worker.render(body.decode("utf-8"))
+        except Exception as e:
+            self.worker.stats.record(time.perf_counter() - start, 1, 1)
+            self.send_bytes(422, f"{type(e).__name__}: {e}\n".encode(), "text/plain")
+            return
+        self.worker.stats.record(time.perf_counter() - start, 1, 0)
+        self.send_bytes(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def render_batch(self, body, start):
+        try:
+            documents = json.loads(body)
+            if not isinstance(documents, list) or not all(isinstance(document, str)
+                    for document in documents):
+                raise ValueError("expected a JSON list of strings")
+        except ValueError as e:
+            self.send_bytes(400, f"Invalid batch: {e}\n".encode(), "text/plain")
+            return
+        results = self.worker.render_many(documents)
+        errors = sum(1 for result in results if "error" in result)
+        self.worker.stats.record(time.perf_counter() - start, len(documents), errors)
+        self.send_bytes(200, json.dumps(results).encode(), "application/json")
+
+    def send_bytes(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_render_server(worker, host = "127.0.0.1", port = 8888):
+    server = ThreadingHTTPServer((host, port),
+        functools.partial(RenderRequestHandler, worker = worker))
+    server.daemon_threads = True
+    return server
+
+def serve_renderer(host = "127.0.0.1", port = 8888, cache_bytes = 64 * 1024 * 1024,
+        max_batch = MAX_BATCH, block_cache_bytes = 0):
+    worker = RenderWorker(cache_bytes, max_batch, block_cache_bytes)
+    worker.batcher.start()
+    with make_render_server(worker, host, port) as httpd:
+        print(f"Rendering markdown on http://{host}:{httpd.server_address[1]}/render")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.batcher.stop()
@@ -0,0 +1,66 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+def write_if_changed(path, data):
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as existing_file:
+                if existing_file.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+    try:
+        output_file = open(path, "wb")
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        output_file = open(path, "wb")
+    with output_file:
+        output_file.write(data)
+    return True
+
+def make_dirs(paths):
+    for directory in sorted(set(os.path.dirname(path) for path in paths)):
+        if directory != "":
+            os.makedirs(directory, exist_ok = True)
+
+class OutputWriter():
+
+    def __init__(self, max_workers = 4, max_pending = 64):
+        self.executor = ThreadPoolExecutor(max_workers = max_workers)
+        # Bounds how many rendered pages can sit in memory waiting for I/O.
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+        self.written = 0
+        self.skipped = 0
+        self.errors = []
+
+    def submit(self, path, text):
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(write_if_changed, path, text.encode("utf-8"))
+        except BaseException:
+            self.pending.release()
+            raise
+        future.add_done_callback(lambda _: self.pending.release())
+        self.futures.append((path, future))
+
+    def close(self):
+        self.executor.shutdown(wait = True)
+        for path, future in self.futures:
+            try:
+                if future.result():
+                    self.written += 1
+                else:
+                    self.skipped += 1
+            except OSError as e:
+                self.errors.append(f"{path}: {type(e).__name__}: {e}")
+        self.futures = []
+        return self.errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False